@@ -1,29 +1,43 @@
+import asyncio
+import atexit
+import ctypes
 import logging
 import os
+import random
+import re
 import subprocess
 import time
+from ctypes import wintypes
 from typing import Optional
+from urllib.parse import urlsplit
 import socket
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
+from urllib3.util.retry import Retry
 
 # 读取 .env 配置（若系统环境变量已设置，则以系统变量为准）
 load_dotenv(override=False)
 
 # 配置项（括号为默认值）
 CHECK_INTERVAL_SECONDS = int(os.getenv("PORTAL_CHECK_INTERVAL", "2"))  # 检测间隔（秒）
+MAX_INTERVAL_SECONDS = int(os.getenv("PORTAL_MAX_INTERVAL", "60"))  # 网络正常时退避的最大检测间隔（秒）
 TARGET_WIFI_SSID = os.getenv("PORTAL_WIFI_SSID", "wifi_name")  # 目标 WiFi SSID
 PORTAL_URL = os.getenv("PORTAL_URL", "http://10.10.10.9")  # 门户地址
-INTERNET_TEST_URL = os.getenv("PORTAL_TEST_URL", "https://www.baidu.com")  # 连通性检测地址
+INTERNET_TEST_URL = os.getenv("PORTAL_TEST_URL", "http://connectivitycheck.gstatic.com/generate_204")  # 连通性检测地址（204 空响应）
 REQUEST_TIMEOUT_SECONDS = int(os.getenv("PORTAL_REQUEST_TIMEOUT", "2"))  # HTTP 请求超时（秒）
 SELENIUM_TIMEOUT_SECONDS = int(os.getenv("PORTAL_SELENIUM_TIMEOUT", "3"))  # Selenium 等待超时（秒）
 LOG_PATH = os.getenv(
@@ -34,10 +48,138 @@ CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")  # 可选：chromedriver 路
 CHROME_BINARY_PATH = os.getenv("CHROME_BINARY_PATH")  # 可选：指定 Chrome/Chromium 可执行文件
 USERNAME_ENV = "PORTAL_USERNAME"  # 用户名变量名
 PASSWORD_ENV = "PORTAL_PASSWORD"  # 密码变量名
+_USERNAME = os.getenv(USERNAME_ENV)  # 启动时读取一次认证信息，登录时不再反复查询环境变量
+_PASSWORD = os.getenv(PASSWORD_ENV)
 PORTAL_HEADLESS = os.getenv("PORTAL_HEADLESS", "true").strip().lower() in {"1", "true", "yes", "on"}
 FAST_DNS_HOST = os.getenv("PORTAL_FAST_DNS_HOST", "223.5.5.5")  # 快速连通性探测主机（阿里DNS）
 FAST_DNS_PORT = int(os.getenv("PORTAL_FAST_DNS_PORT", "53"))
 CONNECT_TIMEOUT_MS = int(os.getenv("PORTAL_CONNECT_TIMEOUT_MS", "800"))  # TCP 快速探测超时（毫秒）
+SSID_CACHE_TTL = int(os.getenv("PORTAL_SSID_CACHE_TTL", "30"))  # SSID 缓存有效期（秒），0 为不缓存
+SUCCESS_TTL = int(os.getenv("PORTAL_SUCCESS_TTL", "15"))  # HTTP 检测成功后免检时长（秒），0 为不缓存
+
+# 连通性检测复用的 HTTP 会话：保持长连接，避免每次检测都重新握手；不做自动重试
+_HTTP = requests.Session()
+_HTTP.headers["Connection"] = "keep-alive"
+for _prefix in ("http://", "https://"):
+    _HTTP.mount(_prefix, HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=Retry(total=0)))
+
+# netsh 输出中的 SSID 行（行首锚定 SSID，天然排除 BSSID 行）
+_SSID_RE = re.compile(r"(?im)^[ \t]*SSID[ \t]*:[ \t]*(.+?)[ \t]*$")
+
+# 门户页面元素定位（门户未提供稳定的 id/name，仍使用绝对 XPath，集中在此便于日后改写为 CSS 选择器）
+_LOGOUT_XPATH = "/html/body/div[1]/div[2]/ul/li[2]/span"
+_USERNAME_XPATH = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[1]/label"
+_PASSWORD_XPATH = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[2]/label"
+_LOGIN_BTN_XPATH = "/html/body/div[2]/div[1]/div/div[3]/div[5]/div[1]/input"
+_LOGOUT_LOC = (By.XPATH, _LOGOUT_XPATH)
+_USERNAME_LOC = (By.XPATH, _USERNAME_XPATH)
+_PASSWORD_LOC = (By.XPATH, _PASSWORD_XPATH)
+_LOGIN_BTN_LOC = (By.XPATH, _LOGIN_BTN_XPATH)
+
+# 上次 HTTP 连通性检测成功的时间戳（SUCCESS_TTL 内直接视为在线）
+_LAST_OK_TS = 0.0
+
+# SSID 缓存：网络正常时复用上次结果，避免每轮都启动 netsh 子进程
+_ssid_cache = {"ssid": None, "ts": 0.0}
+
+
+# ---- wlanapi.dll 结构体定义（仅 Windows 使用），用于进程内直接查询 SSID ----
+_WLAN_CLIENT_VERSION = 2
+_WLAN_INTF_OPCODE_CURRENT_CONNECTION = 7
+_WLAN_INTERFACE_STATE_CONNECTED = 1
+_WLAN_NOTIFICATION_SOURCE_ACM = 0x00000008
+_WLAN_NOTIFICATION_ACM_CONNECTION_COMPLETE = 10
+_WLAN_NOTIFICATION_ACM_DISCONNECTED = 21
+_ERROR_SUCCESS = 0
+
+
+class _GUID(ctypes.Structure):
+    _fields_ = [
+        ("Data1", wintypes.DWORD),
+        ("Data2", wintypes.WORD),
+        ("Data3", wintypes.WORD),
+        ("Data4", ctypes.c_ubyte * 8),
+    ]
+
+
+class _WLAN_INTERFACE_INFO(ctypes.Structure):
+    _fields_ = [
+        ("InterfaceGuid", _GUID),
+        ("strInterfaceDescription", ctypes.c_wchar * 256),
+        ("isState", ctypes.c_uint),
+    ]
+
+
+class _WLAN_INTERFACE_INFO_LIST(ctypes.Structure):
+    _fields_ = [
+        ("dwNumberOfItems", wintypes.DWORD),
+        ("dwIndex", wintypes.DWORD),
+        ("InterfaceInfo", _WLAN_INTERFACE_INFO * 1),
+    ]
+
+
+class _DOT11_SSID(ctypes.Structure):
+    _fields_ = [
+        ("uSSIDLength", wintypes.ULONG),
+        ("ucSSID", ctypes.c_ubyte * 32),
+    ]
+
+
+class _WLAN_ASSOCIATION_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("dot11Ssid", _DOT11_SSID),
+        ("dot11BssType", ctypes.c_uint),
+        ("dot11Bssid", ctypes.c_ubyte * 6),
+        ("dot11PhyType", ctypes.c_uint),
+        ("uDot11PhyIndex", wintypes.ULONG),
+        ("wlanSignalQuality", wintypes.ULONG),
+        ("ulRxRate", wintypes.ULONG),
+        ("ulTxRate", wintypes.ULONG),
+    ]
+
+
+class _WLAN_SECURITY_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("bSecurityEnabled", wintypes.BOOL),
+        ("bOneXEnabled", wintypes.BOOL),
+        ("dot11AuthAlgorithm", ctypes.c_uint),
+        ("dot11CipherAlgorithm", ctypes.c_uint),
+    ]
+
+
+class _WLAN_CONNECTION_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("isState", ctypes.c_uint),
+        ("wlanConnectionMode", ctypes.c_uint),
+        ("strProfileName", ctypes.c_wchar * 256),
+        ("wlanAssociationAttributes", _WLAN_ASSOCIATION_ATTRIBUTES),
+        ("wlanSecurityAttributes", _WLAN_SECURITY_ATTRIBUTES),
+    ]
+
+
+class _WLAN_NOTIFICATION_DATA(ctypes.Structure):
+    _fields_ = [
+        ("NotificationSource", wintypes.DWORD),
+        ("NotificationCode", wintypes.DWORD),
+        ("InterfaceGuid", _GUID),
+        ("dwDataSize", wintypes.DWORD),
+        ("pData", ctypes.c_void_p),
+    ]
+
+
+# WLAN_NOTIFICATION_CALLBACK 使用 WINAPI 调用约定，WINFUNCTYPE 仅在 Windows 上提供
+_WLAN_NOTIFICATION_CALLBACK = (
+    ctypes.WINFUNCTYPE(None, ctypes.POINTER(_WLAN_NOTIFICATION_DATA), ctypes.c_void_p)
+    if os.name == "nt"
+    else None
+)
+
+_wlanapi_dll = None
+# 已注册的 WLAN 通知句柄与回调，需一直持有引用以防回调被垃圾回收
+_wlan_notify = {"handle": None, "callback": None}
+
+# 常驻的浏览器实例（由 get_driver() 懒加载）
+_DRIVER: Optional[webdriver.Chrome] = None
 
 
 def setup_logging() -> None:
@@ -55,7 +197,178 @@ def setup_logging() -> None:
     logging.info("日志初始化完成，输出路径：%s", LOG_PATH)
 
 
+def invalidate_ssid_cache() -> None:
+    """清空 SSID 缓存，下一次 get_current_ssid() 将重新查询。"""
+    _ssid_cache["ts"] = 0.0
+
+
 def get_current_ssid() -> Optional[str]:
+    """获取当前连接的 WiFi SSID（带 TTL 缓存），优先 wlanapi，失败回退 netsh，均失败返回 None。"""
+    now = time.time()
+    if now - _ssid_cache["ts"] < SSID_CACHE_TTL:
+        return _ssid_cache["ssid"]
+
+    try:
+        ssid = _get_ssid_wlanapi()
+    except OSError as exc:
+        logging.debug("wlanapi 查询失败，回退 netsh：%s", exc)
+        ssid = _query_ssid_netsh()
+    _ssid_cache["ssid"] = ssid
+    _ssid_cache["ts"] = now
+    return ssid
+
+
+def _load_wlanapi():
+    """加载 wlanapi.dll 并声明所需函数签名，非 Windows 或加载失败时抛出 OSError。"""
+    global _wlanapi_dll
+    if _wlanapi_dll is not None:
+        return _wlanapi_dll
+    if os.name != "nt":
+        raise OSError("wlanapi 仅在 Windows 上可用")
+
+    dll = ctypes.WinDLL("wlanapi")
+    dll.WlanOpenHandle.argtypes = [
+        wintypes.DWORD,
+        ctypes.c_void_p,
+        ctypes.POINTER(wintypes.DWORD),
+        ctypes.POINTER(wintypes.HANDLE),
+    ]
+    dll.WlanOpenHandle.restype = wintypes.DWORD
+    dll.WlanCloseHandle.argtypes = [wintypes.HANDLE, ctypes.c_void_p]
+    dll.WlanCloseHandle.restype = wintypes.DWORD
+    dll.WlanEnumInterfaces.argtypes = [
+        wintypes.HANDLE,
+        ctypes.c_void_p,
+        ctypes.POINTER(ctypes.POINTER(_WLAN_INTERFACE_INFO_LIST)),
+    ]
+    dll.WlanEnumInterfaces.restype = wintypes.DWORD
+    dll.WlanQueryInterface.argtypes = [
+        wintypes.HANDLE,
+        ctypes.POINTER(_GUID),
+        ctypes.c_uint,
+        ctypes.c_void_p,
+        ctypes.POINTER(wintypes.DWORD),
+        ctypes.POINTER(ctypes.c_void_p),
+        ctypes.c_void_p,
+    ]
+    dll.WlanQueryInterface.restype = wintypes.DWORD
+    dll.WlanFreeMemory.argtypes = [ctypes.c_void_p]
+    dll.WlanFreeMemory.restype = None
+    dll.WlanRegisterNotification.argtypes = [
+        wintypes.HANDLE,
+        wintypes.DWORD,
+        wintypes.BOOL,
+        _WLAN_NOTIFICATION_CALLBACK,
+        ctypes.c_void_p,
+        ctypes.c_void_p,
+        ctypes.POINTER(wintypes.DWORD),
+    ]
+    dll.WlanRegisterNotification.restype = wintypes.DWORD
+    _wlanapi_dll = dll
+    return dll
+
+
+def _get_ssid_wlanapi() -> Optional[str]:
+    """通过 wlanapi 在进程内查询已连接接口的 SSID，未连接返回 None，API 不可用时抛出 OSError。"""
+    wlanapi = _load_wlanapi()
+    negotiated_version = wintypes.DWORD()
+    handle = wintypes.HANDLE()
+    ret = wlanapi.WlanOpenHandle(_WLAN_CLIENT_VERSION, None, ctypes.byref(negotiated_version), ctypes.byref(handle))
+    if ret != _ERROR_SUCCESS:
+        raise OSError(ret, "WlanOpenHandle 调用失败")
+
+    iface_list = ctypes.POINTER(_WLAN_INTERFACE_INFO_LIST)()
+    try:
+        ret = wlanapi.WlanEnumInterfaces(handle, None, ctypes.byref(iface_list))
+        if ret != _ERROR_SUCCESS:
+            raise OSError(ret, "WlanEnumInterfaces 调用失败")
+
+        count = iface_list.contents.dwNumberOfItems
+        infos = (_WLAN_INTERFACE_INFO * count).from_address(ctypes.addressof(iface_list.contents.InterfaceInfo))
+        for info in infos:
+            if info.isState != _WLAN_INTERFACE_STATE_CONNECTED:
+                continue
+            data_size = wintypes.DWORD()
+            data = ctypes.c_void_p()
+            ret = wlanapi.WlanQueryInterface(
+                handle,
+                ctypes.byref(info.InterfaceGuid),
+                _WLAN_INTF_OPCODE_CURRENT_CONNECTION,
+                None,
+                ctypes.byref(data_size),
+                ctypes.byref(data),
+                None,
+            )
+            if ret != _ERROR_SUCCESS:
+                continue
+            try:
+                attrs = ctypes.cast(data, ctypes.POINTER(_WLAN_CONNECTION_ATTRIBUTES)).contents
+                dot11_ssid = attrs.wlanAssociationAttributes.dot11Ssid
+                length = min(dot11_ssid.uSSIDLength, 32)
+                ssid = bytes(dot11_ssid.ucSSID[:length]).decode("utf-8", "replace")
+            finally:
+                wlanapi.WlanFreeMemory(data)
+            logging.debug("wlanapi 检测到 SSID：%s", ssid)
+            return ssid or None
+
+        logging.debug("wlanapi 未发现已连接的无线接口。")
+        return None
+    finally:
+        if iface_list:
+            wlanapi.WlanFreeMemory(iface_list)
+        wlanapi.WlanCloseHandle(handle, None)
+
+
+def register_wlan_notifications(on_change) -> bool:
+    """注册 WLAN 连接完成/断开通知，事件到达时（在 wlanapi 线程中）调用 on_change()。
+
+    注册成功返回 True；wlanapi 不可用或注册失败返回 False，调用方仅依赖定时轮询。
+    """
+    try:
+        wlanapi = _load_wlanapi()
+    except OSError as exc:
+        logging.info("WLAN 通知不可用，仅使用定时轮询：%s", exc)
+        return False
+
+    def _on_notification(data, _context) -> None:
+        notification = data.contents
+        if notification.NotificationSource == _WLAN_NOTIFICATION_SOURCE_ACM and notification.NotificationCode in (
+            _WLAN_NOTIFICATION_ACM_CONNECTION_COMPLETE,
+            _WLAN_NOTIFICATION_ACM_DISCONNECTED,
+        ):
+            on_change()
+
+    callback = _WLAN_NOTIFICATION_CALLBACK(_on_notification)
+    negotiated_version = wintypes.DWORD()
+    handle = wintypes.HANDLE()
+    ret = wlanapi.WlanOpenHandle(_WLAN_CLIENT_VERSION, None, ctypes.byref(negotiated_version), ctypes.byref(handle))
+    if ret != _ERROR_SUCCESS:
+        logging.warning("WlanOpenHandle 调用失败（%s），仅使用定时轮询。", ret)
+        return False
+    ret = wlanapi.WlanRegisterNotification(handle, _WLAN_NOTIFICATION_SOURCE_ACM, True, callback, None, None, None)
+    if ret != _ERROR_SUCCESS:
+        wlanapi.WlanCloseHandle(handle, None)
+        logging.warning("WlanRegisterNotification 调用失败（%s），仅使用定时轮询。", ret)
+        return False
+
+    _wlan_notify["handle"] = handle
+    _wlan_notify["callback"] = callback
+    atexit.register(wlanapi.WlanCloseHandle, handle, None)
+    logging.info("已注册 WLAN 连接状态通知。")
+    return True
+
+
+def _hidden_console_kwargs() -> dict:
+    """Windows 下启动子进程时不创建/显示控制台窗口所需的参数，其他平台返回空字典。"""
+    if os.name != "nt":
+        return {}
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = 0  # SW_HIDE
+    return {"startupinfo": startupinfo, "creationflags": subprocess.CREATE_NO_WINDOW}
+
+
+def _query_ssid_netsh() -> Optional[str]:
     """通过 netsh 获取当前连接的 WiFi SSID，失败返回 None。"""
     try:
         result = subprocess.run(
@@ -63,45 +376,84 @@ def get_current_ssid() -> Optional[str]:
             capture_output=True,
             text=True,
             check=True,
+            **_hidden_console_kwargs(),
         )
     except (subprocess.CalledProcessError, FileNotFoundError) as exc:
         logging.error("执行 netsh 失败：%s", exc)
         return None
 
-    for raw_line in result.stdout.splitlines():
-        line = raw_line.strip()
-        if line.lower().startswith("ssid") and "bssid" not in line.lower():
-            parts = line.split(":", 1)
-            if len(parts) == 2:
-                ssid = parts[1].strip()
-                logging.debug("检测到 SSID：%s", ssid)
-                return ssid or None
+    match = _SSID_RE.search(result.stdout)
+    if match:
+        ssid = match.group(1).strip()
+        logging.debug("检测到 SSID：%s", ssid)
+        return ssid or None
     logging.debug("未从 netsh 输出中解析到 SSID。")
     return None
 
 
+def _tcp_reachable(host: str, port: int, timeout: float) -> bool:
+    """TCP 直连探测，能在 timeout 秒内建立连接即返回 True。"""
+    try:
+        with socket.create_connection((host, port), timeout):
+            return True
+    except OSError:
+        return False
+
+
 def has_internet_connectivity() -> bool:
-    """访问 INTERNET_TEST_URL，状态码 < 400 视为可用。"""
+    """HEAD 访问 INTERNET_TEST_URL（不支持 HEAD 时回退 GET），状态码 200/204 视为可用。
+
+    先对检测地址做一次 TCP 直连，连不上直接判定离线；连得上再发 HTTP 请求，
+    用于识别劫持 80 端口的门户（通常返回 30x 跳转，不会被误判为在线）。
+    最近一次成功后的 SUCCESS_TTL 秒内直接返回 True，不再发起探测。
+    """
+    global _LAST_OK_TS
+    if time.time() - _LAST_OK_TS < SUCCESS_TTL:
+        return True
+
+    target = urlsplit(INTERNET_TEST_URL)
+    port = target.port or (443 if target.scheme == "https" else 80)
+    if not _tcp_reachable(target.hostname or "", port, CONNECT_TIMEOUT_MS / 1000.0):
+        logging.info("连通性检测地址 TCP 不可达：%s:%s", target.hostname, port)
+        invalidate_ssid_cache()
+        return False
+
     try:
-        response = requests.get(
+        response = _HTTP.head(
             INTERNET_TEST_URL,
             timeout=REQUEST_TIMEOUT_SECONDS,
             allow_redirects=False,
         )
+        if response.status_code == 405:
+            response = _HTTP.get(
+                INTERNET_TEST_URL,
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                allow_redirects=False,
+            )
         logging.debug("连通性检测返回状态码：%s", response.status_code)
-        return response.status_code < 400
+        if response.status_code in (200, 204):
+            _LAST_OK_TS = time.time()
+            return True
+        location = response.headers.get("Location")
+        if location:
+            logging.info("检测请求被重定向至 %s，判定处于门户认证状态。", location)
+        invalidate_ssid_cache()
+        return False
     except requests.RequestException as exc:
         logging.info("网络连通性检测失败：%s", exc)
+        invalidate_ssid_cache()
         return False
 
 
+def reset_connectivity_cache() -> None:
+    """清除“最近检测成功”记录，下一次 has_internet_connectivity() 将真实探测。"""
+    global _LAST_OK_TS
+    _LAST_OK_TS = 0.0
+
+
 def has_quick_connectivity() -> bool:
     """使用 TCP 直连 DNS 端口的方式进行亚秒级连通性探测。"""
-    try:
-        with socket.create_connection((FAST_DNS_HOST, FAST_DNS_PORT), CONNECT_TIMEOUT_MS / 1000.0):
-            return True
-    except OSError:
-        return False
+    return _tcp_reachable(FAST_DNS_HOST, FAST_DNS_PORT, CONNECT_TIMEOUT_MS / 1000.0)
 
 
 def is_online() -> bool:
@@ -109,12 +461,26 @@ def is_online() -> bool:
     return has_quick_connectivity() or has_internet_connectivity()
 
 
+# 门户页面上无需加载的资源（CDP Network.setBlockedURLs 通配规则）
+_BLOCKED_URL_PATTERNS = [
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*google-analytics*",
+    "*doubleclick*",
+]
+
+
 def create_webdriver() -> webdriver.Chrome:
     """创建并返回 Chrome WebDriver，支持无头开关并优化加载速度。"""
     chrome_options = ChromeOptions()
     # 加快加载/渲染
     try:
-        chrome_options.page_load_strategy = "eager"  # DOM 完成即继续
+        chrome_options.page_load_strategy = "none"  # 不等待页面加载，由显式等待把关
     except Exception:
         pass
 
@@ -156,84 +522,82 @@ def create_webdriver() -> webdriver.Chrome:
         logging.info("使用系统/缓存中的 chromedriver。")
         service = ChromeService()
 
-    return webdriver.Chrome(service=service, options=chrome_options)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    # 通过 CDP 直接拦截图片/字体/统计脚本请求（保留 JS 与 CSS，登录表单依赖它们）
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _BLOCKED_URL_PATTERNS})
+    except WebDriverException as exc:
+        logging.warning("设置 CDP 资源拦截失败：%s", exc)
+    return driver
 
 
-def try_click(driver: webdriver.Chrome, xpath: str) -> bool:
-    """等待元素可点击并尝试点击，失败返回 False。"""
+def try_click(driver: webdriver.Chrome, locator: tuple) -> bool:
+    """等待元素可点击并尝试点击，失败返回 False。locator 形如 (By.XPATH, "...")。"""
     try:
         element = WebDriverWait(driver, min(SELENIUM_TIMEOUT_SECONDS, 2)).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
+            EC.element_to_be_clickable(locator)
         )
         element.click()
-        logging.info("已点击元素：%s", xpath)
+        logging.info("已点击元素：%s", locator[1])
         return True
     except TimeoutException:
-        logging.info("等待元素超时：%s", xpath)
+        logging.info("等待元素超时：%s", locator[1])
     except (NoSuchElementException, WebDriverException) as exc:
-        logging.warning("点击元素失败：%s，原因：%s", xpath, exc)
+        logging.warning("点击元素失败：%s，原因：%s", locator[1], exc)
     return False
 
 
-def _locate_nearby_input(element) -> Optional[object]:
-    """在给定元素附近尝试找到可输入的 input/textarea。
+# 在页面内一次性完成附近输入框的查找，顺序与原多次 find_element 策略一致
+_JS_NEARBY_INPUT = """
+var e = arguments[0];
+var tag = e.tagName.toLowerCase();
+if (tag === 'input' || tag === 'textarea') return e;
+var d = e.querySelector('input,textarea');
+if (d) return d;
+var s = e.nextElementSibling;
+while (s) { if (s.tagName === 'INPUT') return s; s = s.nextElementSibling; }
+s = e.previousElementSibling;
+while (s) { if (s.tagName === 'INPUT') return s; s = s.previousElementSibling; }
+var p = e.parentElement;
+return p ? p.querySelector('input') : null;
+"""
+
+
+def _locate_nearby_input(driver: webdriver.Chrome, element) -> Optional[object]:
+    """在给定元素附近尝试找到可输入的 input/textarea（单次 execute_script 完成）。
 
     策略顺序：自身 -> 子孙 input -> following-sibling input -> preceding-sibling input -> 父级子树 input -> 将 /label 替换为 /input 的尝试（由上层调用处理）。
     """
     try:
-        tag = element.tag_name.lower()
-    except Exception:
+        return driver.execute_script(_JS_NEARBY_INPUT, element)
+    except WebDriverException as exc:
+        logging.debug("页面内定位输入框失败：%s", exc)
         return None
 
-    if tag in {"input", "textarea"}:
-        return element
-
-    # 子孙 input
-    try:
-        descendants = element.find_elements(By.TAG_NAME, "input")
-        if descendants:
-            return descendants[0]
-    except Exception:
-        pass
-
-    # following-sibling input
-    try:
-        sib = element.find_element(By.XPATH, "following-sibling::input[1]")
-        return sib
-    except Exception:
-        pass
-
-    # preceding-sibling input
-    try:
-        psib = element.find_element(By.XPATH, "preceding-sibling::input[1]")
-        return psib
-    except Exception:
-        pass
-
-    # 父级子树 input（常见容器层）
-    try:
-        parent = element.find_element(By.XPATH, "..")
-        maybe = parent.find_elements(By.XPATH, ".//input")
-        if maybe:
-            return maybe[0]
-    except Exception:
-        pass
 
-    return None
+# 单次 execute_script 完成滚动、聚焦、赋值、触发 input/change 事件并返回最终值
+_JS_FILL = (
+    "var t=arguments[0], v=arguments[1]; t.scrollIntoView({block:'center'}); t.focus(); t.value=v;"
+    " t.dispatchEvent(new Event('input',{bubbles:true})); t.dispatchEvent(new Event('change',{bubbles:true}));"
+    " return t.value;"
+)
 
 
-def fill_field(driver: webdriver.Chrome, xpath: str, value: str) -> bool:
-    """在指定 XPath 附近定位实际输入控件并填充值，失败返回 False。"""
+def fill_field(driver: webdriver.Chrome, locator: tuple, value: str) -> bool:
+    """在定位到的元素附近找到实际输入控件并填充值，失败返回 False。locator 形如 (By.XPATH, "...")。"""
+    by, xpath = locator
     try:
         element = WebDriverWait(driver, min(SELENIUM_TIMEOUT_SECONDS, 1)).until(
-            EC.presence_of_element_located((By.XPATH, xpath))
+            EC.presence_of_element_located(locator)
         )
 
         # 1) 直接/附近定位输入框
-        target = _locate_nearby_input(element)
+        target = _locate_nearby_input(driver, element)
 
         # 2) 额外兜底：将提供的 /label 替换为 /input 再尝试
-        if target is None and xpath.endswith("/label"):
+        if target is None and by == By.XPATH and xpath.endswith("/label"):
             try:
                 alt_xpath = xpath[:-6] + "/input"
                 target = WebDriverWait(driver, 2).until(
@@ -246,11 +610,7 @@ def fill_field(driver: webdriver.Chrome, xpath: str, value: str) -> bool:
             logging.error("未能定位输入控件：%s", xpath)
             return False
 
-        # 尝试点击聚焦
-        try:
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", target)
-        except Exception:
-            pass
+        # 点击聚焦（WebDriver 点击会自动滚动到可见区域）
         try:
             target.click()
         except Exception:
@@ -272,14 +632,9 @@ def fill_field(driver: webdriver.Chrome, xpath: str, value: str) -> bool:
         except Exception as exc:
             logging.debug("send_keys 异常，将尝试 JS 方式：%s", exc)
 
-        # 回退到 JS 直接赋值并触发事件
+        # 回退到 JS：滚动、聚焦、赋值、触发事件并回读，一次调用完成
         try:
-            driver.execute_script(
-                "arguments[0].value = arguments[1]; arguments[0].dispatchEvent(new Event('input', {bubbles:true})); arguments[0].dispatchEvent(new Event('change', {bubbles:true}));",
-                target,
-                value,
-            )
-            current_val = target.get_attribute("value")
+            current_val = driver.execute_script(_JS_FILL, target, value)
             if (current_val or "").strip() == value:
                 logging.info("已填充字段（JS set+events）：%s", xpath)
                 return True
@@ -296,81 +651,59 @@ def fill_field(driver: webdriver.Chrome, xpath: str, value: str) -> bool:
     return False
 
 
-def hover_to_reveal(driver: webdriver.Chrome, target_xpath: str) -> bool:
-    """通过鼠标悬停与 JS 事件尝试让目标元素变为可见（兼容无头）。"""
-    candidate_xpaths = [
-        target_xpath,
-        "/html/body/div[1]/div[2]/ul",
-        "/html/body/div[1]/div[2]",
-    ]
-
-    deadline = time.time() + 0.5  # 最多尝试 ~0.5s
-    while time.time() < deadline:
-        for xp in candidate_xpaths:
-            try:
-                elem = driver.find_element(By.XPATH, xp)
-            except Exception:
-                continue
+# 从目标元素向上逐级强制显示（兼容 hover 才显示的下拉菜单），并派发一次 mouseover
+_JS_REVEAL = """
+var el = document.evaluate(arguments[0], document, null, 9, null).singleNodeValue;
+if (!el) return false;
+var n = el;
+while (n && n !== document.body) {
+    n.style.visibility = 'visible';
+    n.style.opacity = '1';
+    if (getComputedStyle(n).display === 'none') n.style.display = 'block';
+    n = n.parentElement;
+}
+el.dispatchEvent(new Event('mouseover', {bubbles: true}));
+return true;
+"""
 
-            try:
-                driver.execute_script("arguments[0].scrollIntoView({block:'center'});", elem)
-            except Exception:
-                pass
 
-            try:
-                ActionChains(driver).move_to_element(elem).perform()
-            except Exception:
-                pass
-
-            for ev in ("mouseover", "mousemove", "mouseenter"):
-                try:
-                    driver.execute_script(
-                        "var e=new Event(arguments[1],{bubbles:true}); arguments[0].dispatchEvent(e);",
-                        elem,
-                        ev,
-                    )
-                except Exception:
-                    pass
+def hover_to_reveal(driver: webdriver.Chrome, target_xpath: str) -> bool:
+    """通过单次 JS 调用强制目标元素及其祖先可见并触发 mouseover（兼容无头），元素不存在返回 False。"""
+    try:
+        return bool(driver.execute_script(_JS_REVEAL, target_xpath))
+    except WebDriverException as exc:
+        logging.debug("强制显示元素失败：%s，原因：%s", target_xpath, exc)
+        return False
 
-            try:
-                driver.execute_script(
-                    "arguments[0].style.visibility='visible'; arguments[0].style.opacity=1; if (getComputedStyle(arguments[0]).display==='none'){arguments[0].style.display='block';}",
-                    elem,
-                )
-            except Exception:
-                pass
 
-            try:
-                if WebDriverWait(driver, 0.5).until(
-                    EC.visibility_of_element_located((By.XPATH, target_xpath))
-                ):
-                    return True
-            except Exception:
-                continue
-        time.sleep(0.05)
-    return False
+def _wait_logout_done(driver: webdriver.Chrome) -> None:
+    """等待注销按钮消失（页面已切换），最多 3 秒，超时不视为失败。"""
+    try:
+        WebDriverWait(driver, 3, poll_frequency=0.05).until(
+            EC.invisibility_of_element_located(_LOGOUT_LOC)
+        )
+    except TimeoutException:
+        logging.debug("注销后按钮仍可见，继续后续流程。")
 
 
 def attempt_logout(driver: webdriver.Chrome, retries: int = 2) -> bool:
     """尝试点击注销按钮，必要时先 hover/强制显示，再重试点击（含 JS 点击兜底）。"""
-    logout_xpath = "/html/body/div[1]/div[2]/ul/li[2]/span"
-
     for i in range(max(1, retries)):
         # 先尝试通过 hover/JS 让其可见
-        hover_to_reveal(driver, logout_xpath)
+        hover_to_reveal(driver, _LOGOUT_XPATH)
 
         # 优先常规点击
-        if try_click(driver, logout_xpath):
+        if try_click(driver, _LOGOUT_LOC):
             logging.info("第 %s 次尝试：已触发注销。", i + 1)
-            time.sleep(0.2)
+            _wait_logout_done(driver)
             return True
 
         # 兜底：JS 直接点击
         try:
-            elem = driver.find_element(By.XPATH, logout_xpath)
+            elem = driver.find_element(*_LOGOUT_LOC)
             driver.execute_script("arguments[0].click();", elem)
             logging.info("第 %s 次尝试：已通过 JS click 触发注销。", i + 1)
-            time.sleep(0.2)
+            _wait_logout_done(driver)
             return True
         except Exception:
             pass
@@ -381,142 +714,270 @@ def attempt_logout(driver: webdriver.Chrome, retries: int = 2) -> bool:
     return False
 
 
-def open_portal_fresh_tab(driver: webdriver.Chrome) -> None:
-    """在新标签页打开门户并切换过去，尽量保持一个活跃标签。"""
+def close_extra_tabs(driver: webdriver.Chrome) -> None:
+    """关闭除第一个以外的所有标签页并切回第一个，保证复用的浏览器只保留一个标签。"""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+
+def reload_portal(driver: webdriver.Chrome) -> None:
+    """在当前标签页重新打开门户（location.replace 不新增历史记录，也无新标签初始化开销）。
+
+    替换前先给旧文档打标记（同 mark_document_stale），后续 probe_state 在新文档提交前不会报告登录页。
+    """
     try:
-        driver.execute_script("window.open(arguments[0], '_blank');", PORTAL_URL)
-        driver.switch_to.window(driver.window_handles[-1])
-        logging.info("已在新标签页打开门户：%s", PORTAL_URL)
+        driver.execute_script(_MARK_STALE_JS + " location.replace(arguments[0]);", PORTAL_URL)
+        logging.info("已在当前标签重新打开门户：%s", PORTAL_URL)
     except WebDriverException as exc:
-        logging.warning("打开新标签失败，退回到当前标签刷新：%s", exc)
+        logging.warning("location.replace 失败，退回 driver.get：%s", exc)
+        mark_document_stale(driver)
         driver.get(PORTAL_URL)
 
 
-def wait_for_login_form(driver: webdriver.Chrome, timeout_s: int = 8) -> bool:
-    """等待用户名与密码区域出现，以判断处于登录页。"""
-    username_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[1]/label"
-    password_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[2]/label"
+# 导航前给当前文档的 window 打标记；新文档提交后标记随旧 window 一起消失，据此区分新旧页面
+_MARK_STALE_JS = "window.__portalStale = true;"
+_DOM_READY_JS = "return !window.__portalStale && document.readyState !== 'loading';"
+
+
+def mark_document_stale(driver: webdriver.Chrome) -> None:
+    """标记当前文档即将被替换，之后的就绪检测只认新文档。"""
     try:
-        WebDriverWait(driver, timeout_s).until(
-            EC.presence_of_element_located((By.XPATH, username_xpath))
-        )
-        WebDriverWait(driver, timeout_s).until(
-            EC.presence_of_element_located((By.XPATH, password_xpath))
-        )
+        driver.execute_script(_MARK_STALE_JS)
+    except WebDriverException as exc:
+        logging.debug("标记当前文档失败：%s", exc)
+
+
+def wait_for_dom_ready(driver: webdriver.Chrome, timeout_s: int = 8) -> bool:
+    """等待新文档提交并脱离 loading 状态（page_load_strategy=none 时作为表单检测前的轻量闸门）。
+
+    导航前需先调用 mark_document_stale()，否则 driver.get() 刚返回时旧页面也满足 readyState 条件；
+    脚本落在正在卸载的旧文档上抛出的 JavascriptException 视为尚未就绪，继续轮询。
+    """
+    try:
+        WebDriverWait(
+            driver, timeout_s, poll_frequency=0.05, ignored_exceptions=(JavascriptException,)
+        ).until(lambda d: d.execute_script(_DOM_READY_JS))
         return True
     except TimeoutException:
+        logging.debug("等待页面 DOM 就绪超时。")
         return False
 
 
-def is_login_form_present(driver: webdriver.Chrome, quick_timeout_s: int = 1) -> bool:
-    """快速判断是否在登录页面（两个输入区域出现）。"""
-    return wait_for_login_form(driver, timeout_s=quick_timeout_s)
+# 单次 JS 调用同时探测登录表单（用户名+密码区域）与注销按钮是否存在；仍是被标记的旧文档时两者均报告 false
+_PROBE_JS = (
+    "if (window.__portalStale) return {login: false, logout: false};"
+    " function x(p){return !!document.evaluate(p,document,null,9,null).singleNodeValue;}"
+    " return {login: x(arguments[0]) && x(arguments[1]), logout: x(arguments[2])};"
+)
+
+
+def probe_state(driver: webdriver.Chrome) -> dict:
+    """返回 {"login": 是否处于登录页, "logout": 是否存在注销按钮}，仅一次 WebDriver 往返。"""
+    return driver.execute_script(_PROBE_JS, _USERNAME_XPATH, _PASSWORD_XPATH, _LOGOUT_XPATH)
+
+
+def wait_for_portal_state(driver: webdriver.Chrome, timeout_s: float = 1) -> dict:
+    """轮询 probe_state 直到出现登录表单或注销按钮，超时返回最后一次探测结果（导航中的 JavascriptException 忽略）。"""
+    state = {"login": False, "logout": False}
 
+    def _settled(d) -> bool:
+        state.update(probe_state(d))
+        return state["login"] or state["logout"]
 
-def is_logged_in(driver: webdriver.Chrome, quick_timeout_s: int = 1) -> bool:
-    """快速判断是否已登录：通过 hover 显示并检查注销按钮是否可见。"""
-    logout_xpath = "/html/body/div[1]/div[2]/ul/li[2]/span"
-    hover_to_reveal(driver, logout_xpath)
     try:
-        WebDriverWait(driver, quick_timeout_s).until(
-            EC.visibility_of_element_located((By.XPATH, logout_xpath))
-        )
+        WebDriverWait(
+            driver, timeout_s, poll_frequency=0.1, ignored_exceptions=(JavascriptException,)
+        ).until(_settled)
+    except TimeoutException:
+        pass
+    return state
+
+
+def wait_for_login_form(driver: webdriver.Chrome, timeout_s: int = 8) -> bool:
+    """等待新文档上出现用户名与密码区域，以判断处于登录页（导航中的 JavascriptException 忽略）。"""
+    try:
+        WebDriverWait(
+            driver, timeout_s, poll_frequency=0.1, ignored_exceptions=(JavascriptException,)
+        ).until(lambda d: probe_state(d)["login"])
         return True
     except TimeoutException:
         return False
 
 
-def handle_portal_login() -> None:
-    """执行门户登录流程：先打开门户，优先快速判断已登录；否则再判断登录页并处理。"""
-    username = os.getenv(USERNAME_ENV)
-    password = os.getenv(PASSWORD_ENV)
+def get_driver() -> webdriver.Chrome:
+    """返回常驻的 WebDriver 实例，不存在时才创建，跨多次登录复用以省去浏览器冷启动。"""
+    global _DRIVER
+    if _DRIVER is None:
+        _DRIVER = create_webdriver()
+        _DRIVER.set_page_load_timeout(max(SELENIUM_TIMEOUT_SECONDS, 2))
+    return _DRIVER
 
-    if not username or not password:
-        logging.error("缺少认证信息，请设置环境变量 %s 和 %s。", USERNAME_ENV, PASSWORD_ENV)
-        return
 
+def discard_driver() -> None:
+    """关闭并丢弃当前 WebDriver 实例，下一次 get_driver() 将重新创建。"""
+    global _DRIVER
+    driver, _DRIVER = _DRIVER, None
+    if driver is None:
+        return
     try:
-        driver = create_webdriver()
+        driver.quit()
+        logging.info("浏览器实例已关闭。")
     except WebDriverException as exc:
-        logging.error("初始化 WebDriver 失败：%s", exc)
-        return
+        logging.debug("关闭浏览器实例失败：%s", exc)
 
-    try:
-        driver.set_page_load_timeout(max(SELENIUM_TIMEOUT_SECONDS, 2))
-        logging.info("访问门户页面：%s", PORTAL_URL)
-        driver.get(PORTAL_URL)
 
-        # 先快速判断已登录（更省时）
-        if is_logged_in(driver, quick_timeout_s=1):
-            logging.info("检测到已登录状态，开始注销。")
-            attempt_logout(driver, retries=3)
-            open_portal_fresh_tab(driver)
+atexit.register(discard_driver)
+
+
+def _login_with_driver(driver: webdriver.Chrome, username: str, password: str, assume_needs_login: bool) -> None:
+    """在给定浏览器会话中完成注销/登录；会话失效时 WebDriverException 向上抛出。"""
+    close_extra_tabs(driver)
+    logging.info("访问门户页面：%s", PORTAL_URL)
+    mark_document_stale(driver)
+    driver.get(PORTAL_URL)
+    wait_for_dom_ready(driver)
+
+    state = wait_for_portal_state(driver, timeout_s=1)
+
+    # 确定需要登录（外网不通）时不走已登录分支；否则先看是否已登录
+    if not assume_needs_login and state["logout"]:
+        logging.info("检测到已登录状态，开始注销。")
+        attempt_logout(driver, retries=3)
+        reload_portal(driver)
+        if not wait_for_login_form(driver, timeout_s=6):
+            logging.error("注销后未见登录页，放弃本次流程。")
+            return
+    else:
+        # 未识别为已登录，则看是否直接在登录页
+        if not state["login"]:
+            # 重新打开门户尝试进入登录页
+            reload_portal(driver)
             if not wait_for_login_form(driver, timeout_s=6):
-                logging.error("注销后未见登录页，放弃本次流程。")
-                return
-        else:
-            # 未识别为已登录，则看是否直接在登录页
-            if not is_login_form_present(driver, quick_timeout_s=1):
-                # 打开新标签页尝试进入登录页
-                open_portal_fresh_tab(driver)
+                # 再尝试一次注销并进入登录页
+                attempt_logout(driver, retries=2)
+                reload_portal(driver)
                 if not wait_for_login_form(driver, timeout_s=6):
-                    # 再尝试一次注销并进入登录页
-                    attempt_logout(driver, retries=2)
-                    open_portal_fresh_tab(driver)
-                    if not wait_for_login_form(driver, timeout_s=6):
-                        logging.error("未能进入登录页，放弃本次流程。")
-                        return
-
-        # 2) 填写用户名与密码，并点击登录
-        username_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[1]/label"
-        password_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[2]/label"
-        login_button_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[5]/div[1]/input"
-
-        if not fill_field(driver, username_xpath, username):
-            logging.error("填充用户名失败，终止流程。")
-            return
-        if not fill_field(driver, password_xpath, password):
-            logging.error("填充密码失败，终止流程。")
-            return
+                    logging.error("未能进入登录页，放弃本次流程。")
+                    return
 
-        if not try_click(driver, login_button_xpath):
-            logging.error("点击登录按钮失败。")
-            return
+    # 2) 填写用户名与密码，并点击登录
+    if not fill_field(driver, _USERNAME_LOC, username):
+        logging.error("填充用户名失败，终止流程。")
+        return
+    if not fill_field(driver, _PASSWORD_LOC, password):
+        logging.error("填充密码失败，终止流程。")
+        return
+
+    if not try_click(driver, _LOGIN_BTN_LOC):
+        logging.error("点击登录按钮失败。")
+        return
+
+    logging.info("登录已提交，开始快速轮询网络连通性。")
+    try:
+        WebDriverWait(driver, 10, poll_frequency=0.1).until(lambda _d: is_online())
+        logging.info("网络连通性恢复。")
+    except TimeoutException:
+        logging.warning("登录提交后 10 秒内网络仍未恢复。")
+
+
+def handle_portal_login(assume_needs_login: bool = True) -> None:
+    """执行门户登录流程：先打开门户，判断登录页并处理，必要时先注销。
+
+    assume_needs_login 为 True（默认，调用方已确认外网不通）时不做耗时的“已登录”悬停探测，
+    直接进入登录页；仅当登录页未出现时才回退到注销分支。为 False 时先快速判断已登录。
+    浏览器实例在多次调用间复用；会话失效（WebDriverException）时重建浏览器并重试一次。
+    """
+    username = _USERNAME
+    password = _PASSWORD
+
+    if not username or not password:
+        logging.error("缺少认证信息，请设置环境变量 %s 和 %s。", USERNAME_ENV, PASSWORD_ENV)
+        return
+
+    try:
+        for attempt in range(2):
+            try:
+                driver = get_driver()
+            except WebDriverException as exc:
+                logging.error("初始化 WebDriver 失败：%s", exc)
+                return
 
-        logging.info("登录已提交，开始快速轮询网络连通性。")
-        start_ts = time.time()
-        while time.time() - start_ts < 10:
-            if is_online():
-                logging.info("网络连通性恢复。")
-                break
-            time.sleep(0.5)
+            try:
+                _login_with_driver(driver, username, password, assume_needs_login)
+                return
+            except TimeoutException as exc:
+                logging.warning("门户页面加载超时，放弃本次流程：%s", exc)
+                return
+            except WebDriverException as exc:
+                logging.warning("浏览器会话异常（第 %s 次），重建浏览器后重试：%s", attempt + 1, exc)
+                discard_driver()
+    except Exception:
+        reset_connectivity_cache()
+        raise
     finally:
-        driver.quit()
-        logging.info("浏览器实例已关闭。")
+        invalidate_ssid_cache()
 
 
-def main_loop() -> None:
-    """前台循环运行：仅当连接到目标 SSID 且无外网连通性时执行登录流程。"""
+async def main_loop() -> None:
+    """前台循环运行：仅当连接到目标 SSID 且无外网连通性时执行登录流程。
+
+    每轮并发执行 SSID 查询与连通性探测（阻塞调用放到线程池），浏览器登录流程同样在线程池中执行。
+    网络正常时检测间隔按 2 倍递增至 PORTAL_MAX_INTERVAL；出现断网、异常或 SSID 变化时立即回到基础间隔。
+    Windows 上收到 WLAN 连接/断开通知时立即唤醒重新检测，定时轮询仅作为兜底心跳。
+    """
     setup_logging()
     logging.info("前台模式启动。目标 WiFi：%s，检测间隔：%s 秒，Headless=%s", TARGET_WIFI_SSID, CHECK_INTERVAL_SECONDS, PORTAL_HEADLESS)
 
+    loop = asyncio.get_running_loop()
+    wlan_event = asyncio.Event()
+    register_wlan_notifications(lambda: loop.call_soon_threadsafe(wlan_event.set))
+
+    current_interval = CHECK_INTERVAL_SECONDS
+    last_ssid: Optional[str] = None
     while True:
+        healthy = False
         try:
-            ssid = get_current_ssid()
+            ssid, online = await asyncio.gather(
+                asyncio.to_thread(get_current_ssid),
+                asyncio.to_thread(is_online),
+            )
+            if not online:
+                # 并发读取的 SSID 可能来自 TTL 缓存；检测失败已清空缓存，登录前重新读取一次
+                ssid = await asyncio.to_thread(get_current_ssid)
+            if ssid != last_ssid:
+                current_interval = CHECK_INTERVAL_SECONDS
+                last_ssid = ssid
             if ssid == TARGET_WIFI_SSID:
                 logging.debug("当前连接到目标 WiFi：%s", ssid)
-                if is_online():
+                if online:
                     logging.info("网络连通性正常，无需操作。")
+                    healthy = True
                 else:
                     logging.warning("检测到网络不可用，开始门户自动登录流程。")
-                    handle_portal_login()
+                    await asyncio.to_thread(handle_portal_login)
             else:
                 logging.debug("当前 SSID(%s) 非目标 WiFi(%s)，跳过。", ssid, TARGET_WIFI_SSID)
+                healthy = True
         except Exception as exc:  # pylint: disable=broad-except
             logging.exception("循环执行出现异常：%s", exc)
 
-        time.sleep(CHECK_INTERVAL_SECONDS)
+        if healthy:
+            current_interval = min(current_interval * 2, max(MAX_INTERVAL_SECONDS, CHECK_INTERVAL_SECONDS))
+        else:
+            current_interval = CHECK_INTERVAL_SECONDS
+        # 加入随机抖动，避免多实例同步重试；WLAN 通知可提前唤醒
+        try:
+            await asyncio.wait_for(wlan_event.wait(), timeout=current_interval * random.uniform(0.8, 1.2))
+        except asyncio.TimeoutError:
+            continue
+        wlan_event.clear()
+        logging.info("收到 WLAN 连接状态变化通知，立即重新检测。")
+        invalidate_ssid_cache()
+        current_interval = CHECK_INTERVAL_SECONDS
 
 
 if __name__ == "__main__":
-    main_loop() 
+    asyncio.run(main_loop()) 
@@ -1,23 +1,47 @@
+import asyncio
+import atexit
+import ctypes
+import functools
+import json
+import locale
 import logging
+import logging.handlers
 import os
 import platform
+import queue
+import re
+import select
+import signal
 import subprocess
+import tempfile
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from ctypes import wintypes
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
 import socket
 
 import requests
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 # 读取 .env 配置（若系统环境变量已设置，则以系统变量为准）
+_PROCESS_ENV = dict(os.environ)  # 加载 .env 之前的系统环境变量，重新加载配置时仍以其为准
 load_dotenv(override=False)
 
 # 配置项（括号为默认值）
@@ -33,12 +57,182 @@ LOG_PATH = os.getenv(
 )  # 日志文件路径
 CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")  # 可选：chromedriver 路径（留空走系统默认）
 CHROME_BINARY_PATH = os.getenv("CHROME_BINARY_PATH")  # 可选：指定 Chrome/Chromium 可执行文件
+CHROME_PROFILE_DIR = os.getenv(
+    "PORTAL_CHROME_PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "portal-chrome-profile"),
+)  # 固定的浏览器配置目录，复用已初始化的 profile 以缩短冷启动
 USERNAME_ENV = "PORTAL_USERNAME"  # 用户名变量名
 PASSWORD_ENV = "PORTAL_PASSWORD"  # 密码变量名
 PORTAL_HEADLESS = os.getenv("PORTAL_HEADLESS", "true").strip().lower() in {"1", "true", "yes", "on"}
-FAST_DNS_HOST = os.getenv("PORTAL_FAST_DNS_HOST", "223.5.5.5")  # 快速连通性探测主机（阿里DNS）
+PORTAL_BLOCK_ASSETS = os.getenv("PORTAL_BLOCK_ASSETS", "true").strip().lower() in {"1", "true", "yes", "on"}  # 通过 CDP 拦截图片/字体/统计脚本
+PORTAL_USE_BROWSER = os.getenv("PORTAL_USE_BROWSER", "false").strip().lower() in {"1", "true", "yes", "on"}  # 跳过 HTTP 直登，始终走浏览器
+PORTAL_CHROME_SINGLE_PROCESS = os.getenv("PORTAL_CHROME_SINGLE_PROCESS", "false").strip().lower() in {"1", "true", "yes", "on"}  # 单进程模式，省内存但个别版本不稳定
+FAST_DNS_HOST = os.getenv("PORTAL_FAST_DNS_HOST", "223.5.5.5")  # 快速离线判定的 DNS 主机（阿里DNS）
 FAST_DNS_PORT = int(os.getenv("PORTAL_FAST_DNS_PORT", "53"))
+PORTAL_DNS_FAST_OFFLINE = os.getenv("PORTAL_DNS_FAST_OFFLINE", "false").strip().lower() in {"1", "true", "yes", "on"}  # 连续多次 DNS 无应答时不等 HTTP 直接判定离线
 CONNECT_TIMEOUT_MS = int(os.getenv("PORTAL_CONNECT_TIMEOUT_MS", "800"))  # TCP 快速探测超时（毫秒）
+HEARTBEAT_SECONDS = int(os.getenv("PORTAL_HEARTBEAT_INTERVAL", "60"))  # 启用网络变化监听后的兜底检测间隔（秒）
+MAX_BACKOFF_SECONDS = int(os.getenv("PORTAL_MAX_BACKOFF", "30"))  # 断网/非目标 WiFi 时检测间隔指数退避的上限（秒）
+SSID_CACHE_TTL_SECONDS = 4.0  # SSID 缓存有效期（秒），期间不再调用系统命令
+
+
+class Config(NamedTuple):
+    """登录流程每轮都会用到的配置快照，启动时生成一次；收到 SIGHUP 时整体替换 CFG。"""
+
+    username: Optional[str]
+    password: Optional[str]
+    ssid: str
+    portal_url: str
+
+
+def load_config() -> Config:
+    """按“系统环境变量优先、其次 .env”的规则生成配置快照。"""
+    env = {**dotenv_values(), **_PROCESS_ENV}
+    return Config(
+        username=env.get(USERNAME_ENV),
+        password=env.get(PASSWORD_ENV),
+        ssid=env.get("PORTAL_WIFI_SSID") or TARGET_WIFI_SSID,
+        portal_url=env.get("PORTAL_URL") or PORTAL_URL,
+    )
+
+
+CFG = load_config()
+_RELOAD_REQUESTED = [False]  # SIGHUP 处理函数只置位，由主循环执行重新加载
+
+
+def _reload_config() -> None:
+    """重新读取 .env 并替换 CFG，无需重启进程即可更新账号或目标 WiFi（由主循环在收到 SIGHUP 后调用）。"""
+    global CFG
+    CFG = load_config()
+    logging.info("已重新加载配置。目标 WiFi：%s，门户：%s", CFG.ssid, CFG.portal_url)
+
+
+_SYSTEM = platform.system().lower()
+_AIRPORT_PATH = "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport"
+_SSID_CACHE: tuple[float, Optional[str]] = (0.0, None)  # (查询时刻 monotonic, SSID)
+
+# netsh / airport 输出中的 SSID 行（行首锚定 SSID，天然排除 BSSID 行；netsh 按字节匹配，免去整段解码）
+_NETSH_SSID_RE = re.compile(rb"(?im)^[ \t]*SSID[ \t]*:[ \t]*(.+?)[ \t\r]*$")
+_AIRPORT_SSID_RE = re.compile(r"(?im)^[ \t]*SSID:[ \t]*(.*?)[ \t\r]*$")
+# networksetup -getairportnetwork 关联时的输出；未关联或非 Wi-Fi 接口输出其他提示，不视为 SSID
+_NETWORKSETUP_SSID_RE = re.compile(r"(?m)^Current Wi-Fi Network:[ \t]*(.+?)[ \t\r]*$")
+
+# 门户页面元素定位（XPath 字符串供页面内脚本使用，_LOC 元组供 Selenium 等待条件使用）
+_LOGOUT_XPATH = "/html/body/div[1]/div[2]/ul/li[2]/span"
+_USERNAME_XPATH = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[1]/label"
+_PASSWORD_XPATH = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[2]/label"
+_LOGIN_BTN_XPATH = "/html/body/div[2]/div[1]/div/div[3]/div[5]/div[1]/input"
+_REVEAL_CONTAINER_XPATHS = ("/html/body/div[1]/div[2]/ul", "/html/body/div[1]/div[2]")  # 注销按钮所在的悬停容器
+_LOGOUT_LOC = (By.XPATH, _LOGOUT_XPATH)
+_USERNAME_LOC = (By.XPATH, _USERNAME_XPATH)
+_PASSWORD_LOC = (By.XPATH, _PASSWORD_XPATH)
+_LOGIN_BTN_LOC = (By.XPATH, _LOGIN_BTN_XPATH)
+
+# 连通性检测复用的 HTTP 会话：单连接池 + keep-alive，避免每次探测都重新建连/握手
+_SESSION = requests.Session()
+_SESSION.headers["Connection"] = "keep-alive"
+for _prefix in ("http://", "https://"):
+    _SESSION.mount(_prefix, HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0))
+
+# ---- wlanapi.dll 结构体定义（仅 Windows 使用），用于进程内查询 SSID 与注册 WLAN 通知 ----
+_WLAN_CLIENT_VERSION = 2
+_WLAN_INTF_OPCODE_CURRENT_CONNECTION = 7
+_WLAN_INTERFACE_STATE_CONNECTED = 1
+_WLAN_NOTIFICATION_SOURCE_ACM = 0x00000008
+_WLAN_NOTIFICATION_ACM_CONNECTION_COMPLETE = 10
+_WLAN_NOTIFICATION_ACM_DISCONNECTED = 21
+_ERROR_SUCCESS = 0
+
+
+class _GUID(ctypes.Structure):
+    _fields_ = [
+        ("Data1", wintypes.DWORD),
+        ("Data2", wintypes.WORD),
+        ("Data3", wintypes.WORD),
+        ("Data4", ctypes.c_ubyte * 8),
+    ]
+
+
+class _WLAN_INTERFACE_INFO(ctypes.Structure):
+    _fields_ = [
+        ("InterfaceGuid", _GUID),
+        ("strInterfaceDescription", ctypes.c_wchar * 256),
+        ("isState", ctypes.c_uint),
+    ]
+
+
+class _WLAN_INTERFACE_INFO_LIST(ctypes.Structure):
+    _fields_ = [
+        ("dwNumberOfItems", wintypes.DWORD),
+        ("dwIndex", wintypes.DWORD),
+        ("InterfaceInfo", _WLAN_INTERFACE_INFO * 1),
+    ]
+
+
+class _DOT11_SSID(ctypes.Structure):
+    _fields_ = [
+        ("uSSIDLength", wintypes.ULONG),
+        ("ucSSID", ctypes.c_ubyte * 32),
+    ]
+
+
+class _WLAN_ASSOCIATION_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("dot11Ssid", _DOT11_SSID),
+        ("dot11BssType", ctypes.c_uint),
+        ("dot11Bssid", ctypes.c_ubyte * 6),
+        ("dot11PhyType", ctypes.c_uint),
+        ("uDot11PhyIndex", wintypes.ULONG),
+        ("wlanSignalQuality", wintypes.ULONG),
+        ("ulRxRate", wintypes.ULONG),
+        ("ulTxRate", wintypes.ULONG),
+    ]
+
+
+class _WLAN_SECURITY_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("bSecurityEnabled", wintypes.BOOL),
+        ("bOneXEnabled", wintypes.BOOL),
+        ("dot11AuthAlgorithm", ctypes.c_uint),
+        ("dot11CipherAlgorithm", ctypes.c_uint),
+    ]
+
+
+class _WLAN_CONNECTION_ATTRIBUTES(ctypes.Structure):
+    _fields_ = [
+        ("isState", ctypes.c_uint),
+        ("wlanConnectionMode", ctypes.c_uint),
+        ("strProfileName", ctypes.c_wchar * 256),
+        ("wlanAssociationAttributes", _WLAN_ASSOCIATION_ATTRIBUTES),
+        ("wlanSecurityAttributes", _WLAN_SECURITY_ATTRIBUTES),
+    ]
+
+
+class _WLAN_NOTIFICATION_DATA(ctypes.Structure):
+    _fields_ = [
+        ("NotificationSource", wintypes.DWORD),
+        ("NotificationCode", wintypes.DWORD),
+        ("InterfaceGuid", _GUID),
+        ("dwDataSize", wintypes.DWORD),
+        ("pData", ctypes.c_void_p),
+    ]
+
+
+# WLAN_NOTIFICATION_CALLBACK 使用 WINAPI 调用约定，WINFUNCTYPE 仅在 Windows 上提供
+_WLAN_NOTIFICATION_CALLBACK = (
+    ctypes.WINFUNCTYPE(None, ctypes.POINTER(_WLAN_NOTIFICATION_DATA), ctypes.c_void_p)
+    if os.name == "nt"
+    else None
+)
+
+_wlanapi_dll = None
+
+# macOS：CoreWLAN（pyobjc-framework-CoreWLAN，可选），可在进程内直接读取 SSID
+try:
+    from CoreWLAN import CWWiFiClient
+except ImportError:
+    CWWiFiClient = None
+_WIFI_CLIENT = None  # 缓存的 CWWiFiClient.sharedWiFiClient()，避免每次查询重复 ObjC 查找
 
 #
 # def setup_logging() -> None:
@@ -58,85 +252,297 @@ CONNECT_TIMEOUT_MS = int(os.getenv("PORTAL_CONNECT_TIMEOUT_MS", "800"))  # TCP 
 #     logging.basicConfig(
 #         level=getattr(logging, level)
 #     )
+_LOG_LISTENER: Optional[logging.handlers.QueueListener] = None  # 后台写日志的监听线程
+
+
 def setup_logging() -> None:
     """初始化日志配置：同时输出到文件与控制台。"""
+    global _LOG_LISTENER
     if logging.getLogger().handlers:
         return
 
     level = os.getenv("PORTAL_LOG_LEVEL", "INFO").upper()
-    logging.basicConfig(
-        level=getattr(logging, level, logging.INFO),
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[
-            logging.FileHandler(LOG_PATH, encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
-    )
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+    handlers = [logging.FileHandler(LOG_PATH, encoding="utf-8"), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # 主循环只把日志记录放入队列，由后台监听线程负责格式化与写文件/控制台
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _LOG_LISTENER = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _LOG_LISTENER.start()
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level, logging.INFO))
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
     logging.info("日志初始化完成，输出路径：%s (Level=%s)", LOG_PATH, level)
 
 
-def _run_cmd(cmd: list[str]) -> Optional[str]:
-    """执行命令并返回标准输出，失败返回 None。"""
+def _stop_log_listener() -> None:
+    """退出时排空日志队列并停止监听线程。"""
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+
+
+# 先于浏览器/驱动的清理钩子注册：atexit 后进先出，保证它们的日志在监听线程停止前写出
+atexit.register(_stop_log_listener)
+
+
+def _run_cmd_fast(argv: list[str], max_bytes: int = 4096, timeout_s: float = 2.0) -> Optional[str]:
+    """POSIX：用 os.posix_spawnp + 管道执行命令并返回标准输出（macOS 上走 vfork 语义，免去复制当前进程页表）。
+
+    标准输出最多读取 max_bytes 字节，超出部分不再读取；stderr 重定向到 /dev/null、不建管道；
+    启动失败、超过 timeout_s 秒（子进程被 SIGKILL）或非零退出时返回 None。
+    """
+    read_fd, write_fd = os.pipe()
+    devnull = os.open(os.devnull, os.O_WRONLY)
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return result.stdout
-    except Exception as exc:
-        logging.debug("执行命令失败 %s：%s", cmd, exc)
+        pid = os.posix_spawnp(
+            argv[0],
+            argv,
+            os.environ,
+            file_actions=[
+                (os.POSIX_SPAWN_DUP2, write_fd, 1),
+                (os.POSIX_SPAWN_DUP2, devnull, 2),
+                (os.POSIX_SPAWN_CLOSE, read_fd),
+            ],
+        )
+    except OSError as exc:
+        os.close(read_fd)
+        logging.debug("执行命令失败 %s：%s", argv, exc)
         return None
+    finally:
+        os.close(write_fd)
+        os.close(devnull)
+
+    chunks: list[bytes] = []
+    total = 0
+    deadline = time.monotonic() + timeout_s
+    timed_out = False
+    try:
+        while total < max_bytes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+                timed_out = True
+                break
+            chunk = os.read(read_fd, max_bytes - total)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            total += len(chunk)
+    finally:
+        os.close(read_fd)  # 超出部分不再读取
+
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    _, status = os.waitpid(pid, 0)
+    if timed_out:
+        logging.debug("执行命令超时 %s", argv)
+        return None
+    code = os.waitstatus_to_exitcode(status)
+    if code != 0 and total < max_bytes:  # 读满后提前关闭管道导致的 SIGPIPE 不算失败
+        logging.debug("执行命令失败 %s：返回码 %s", argv, code)
+        return None
+    return b"".join(chunks).decode("utf-8", "replace")
+
+
+@functools.lru_cache(maxsize=None)
+def _airport_path() -> Optional[str]:
+    """返回 airport 工具路径；不存在（新版 macOS 已移除）时返回 None，此后直接走 networksetup。"""
+    return _AIRPORT_PATH if os.path.exists(_AIRPORT_PATH) else None
+
+
+def invalidate_ssid_cache() -> None:
+    """清空 SSID 缓存，下一次 get_current_ssid() 将重新查询。"""
+    global _SSID_CACHE
+    _SSID_CACHE = (0.0, None)
 
 
 def get_current_ssid() -> Optional[str]:
-    """跨平台获取当前 WiFi SSID。
+    """获取当前 WiFi SSID，SSID_CACHE_TTL_SECONDS 内直接返回缓存结果，不再启动子进程。"""
+    global _SSID_CACHE
+    cached_ts, cached_ssid = _SSID_CACHE
+    now = time.monotonic()
+    if cached_ts and now - cached_ts < SSID_CACHE_TTL_SECONDS:
+        return cached_ssid
+    ssid = _query_ssid()
+    _SSID_CACHE = (now, ssid)
+    return ssid
+
+
+def _load_wlanapi():
+    """加载 wlanapi.dll 并声明所需函数签名，非 Windows 或加载失败时抛出 OSError。"""
+    global _wlanapi_dll
+    if _wlanapi_dll is not None:
+        return _wlanapi_dll
+    if os.name != "nt":
+        raise OSError("wlanapi 仅在 Windows 上可用")
+
+    dll = ctypes.WinDLL("wlanapi")
+    dll.WlanOpenHandle.argtypes = [
+        wintypes.DWORD,
+        ctypes.c_void_p,
+        ctypes.POINTER(wintypes.DWORD),
+        ctypes.POINTER(wintypes.HANDLE),
+    ]
+    dll.WlanOpenHandle.restype = wintypes.DWORD
+    dll.WlanCloseHandle.argtypes = [wintypes.HANDLE, ctypes.c_void_p]
+    dll.WlanCloseHandle.restype = wintypes.DWORD
+    dll.WlanEnumInterfaces.argtypes = [
+        wintypes.HANDLE,
+        ctypes.c_void_p,
+        ctypes.POINTER(ctypes.POINTER(_WLAN_INTERFACE_INFO_LIST)),
+    ]
+    dll.WlanEnumInterfaces.restype = wintypes.DWORD
+    dll.WlanQueryInterface.argtypes = [
+        wintypes.HANDLE,
+        ctypes.POINTER(_GUID),
+        ctypes.c_uint,
+        ctypes.c_void_p,
+        ctypes.POINTER(wintypes.DWORD),
+        ctypes.POINTER(ctypes.c_void_p),
+        ctypes.c_void_p,
+    ]
+    dll.WlanQueryInterface.restype = wintypes.DWORD
+    dll.WlanFreeMemory.argtypes = [ctypes.c_void_p]
+    dll.WlanFreeMemory.restype = None
+    dll.WlanRegisterNotification.argtypes = [
+        wintypes.HANDLE,
+        wintypes.DWORD,
+        wintypes.BOOL,
+        _WLAN_NOTIFICATION_CALLBACK,
+        ctypes.c_void_p,
+        ctypes.c_void_p,
+        ctypes.POINTER(wintypes.DWORD),
+    ]
+    dll.WlanRegisterNotification.restype = wintypes.DWORD
+    _wlanapi_dll = dll
+    return dll
 
-    Windows: 使用 netsh wlan show interfaces
-    macOS: 使用 airport -I 或 networksetup -getairportnetwork
+
+def _get_ssid_wlanapi() -> Optional[str]:
+    """通过 wlanapi 在进程内查询已连接接口的 SSID，未连接返回 None，API 不可用时抛出 OSError。"""
+    wlanapi = _load_wlanapi()
+    negotiated_version = wintypes.DWORD()
+    handle = wintypes.HANDLE()
+    ret = wlanapi.WlanOpenHandle(_WLAN_CLIENT_VERSION, None, ctypes.byref(negotiated_version), ctypes.byref(handle))
+    if ret != _ERROR_SUCCESS:
+        raise OSError(ret, "WlanOpenHandle 调用失败")
+
+    iface_list = ctypes.POINTER(_WLAN_INTERFACE_INFO_LIST)()
+    try:
+        ret = wlanapi.WlanEnumInterfaces(handle, None, ctypes.byref(iface_list))
+        if ret != _ERROR_SUCCESS:
+            raise OSError(ret, "WlanEnumInterfaces 调用失败")
+
+        count = iface_list.contents.dwNumberOfItems
+        infos = (_WLAN_INTERFACE_INFO * count).from_address(ctypes.addressof(iface_list.contents.InterfaceInfo))
+        for info in infos:
+            if info.isState != _WLAN_INTERFACE_STATE_CONNECTED:
+                continue
+            data_size = wintypes.DWORD()
+            data = ctypes.c_void_p()
+            ret = wlanapi.WlanQueryInterface(
+                handle,
+                ctypes.byref(info.InterfaceGuid),
+                _WLAN_INTF_OPCODE_CURRENT_CONNECTION,
+                None,
+                ctypes.byref(data_size),
+                ctypes.byref(data),
+                None,
+            )
+            if ret != _ERROR_SUCCESS:
+                continue
+            try:
+                attrs = ctypes.cast(data, ctypes.POINTER(_WLAN_CONNECTION_ATTRIBUTES)).contents
+                dot11_ssid = attrs.wlanAssociationAttributes.dot11Ssid
+                length = min(dot11_ssid.uSSIDLength, 32)
+                ssid = bytes(dot11_ssid.ucSSID[:length]).decode("utf-8", "replace")
+            finally:
+                wlanapi.WlanFreeMemory(data)
+            logging.debug("wlanapi 检测到 SSID：%s", ssid)
+            return ssid or None
+
+        logging.debug("wlanapi 未发现已连接的无线接口。")
+        return None
+    finally:
+        if iface_list:
+            wlanapi.WlanFreeMemory(iface_list)
+        wlanapi.WlanCloseHandle(handle, None)
+
+
+def _ssid_via_corewlan() -> Optional[str]:
+    """macOS：通过 CoreWLAN 在进程内读取 SSID；未安装 pyobjc-framework-CoreWLAN 时抛出 OSError。"""
+    global _WIFI_CLIENT
+    if CWWiFiClient is None:
+        raise OSError("未安装 pyobjc-framework-CoreWLAN")
+    if _WIFI_CLIENT is None:
+        _WIFI_CLIENT = CWWiFiClient.sharedWiFiClient()
+    interface = _WIFI_CLIENT.interface()
+    ssid = interface.ssid() if interface is not None else None
+    logging.debug("CoreWLAN 检测到 SSID：%s", ssid)
+    return ssid or None
+
+
+def _query_ssid() -> Optional[str]:
+    """跨平台查询当前 WiFi SSID。
+
+    Windows: 优先 wlanapi 进程内查询，不可用时使用 netsh wlan show interfaces
+    macOS: 优先 CoreWLAN 进程内查询，取不到时使用 airport -I 或 networksetup -getairportnetwork
     """
-    system = platform.system().lower()
+    system = _SYSTEM
 
     if system == "windows":
+        try:
+            return _get_ssid_wlanapi()
+        except OSError as exc:
+            logging.debug("wlanapi 查询 SSID 失败，回退 netsh：%s", exc)
+
         # Windows: netsh wlan show interfaces
         try:
             result = subprocess.run(
                 ["netsh", "wlan", "show", "interfaces"],
                 capture_output=True,
-                text=True,
                 check=True,
             )
         except (subprocess.CalledProcessError, FileNotFoundError) as exc:
             logging.error("执行 netsh 失败：%s", exc)
             return None
 
-        for raw_line in result.stdout.splitlines():
-            line = raw_line.strip()
-            if line.lower().startswith("ssid") and "bssid" not in line.lower():
-                parts = line.split(":", 1)
-                if len(parts) == 2:
-                    ssid = parts[1].strip()
-                    logging.debug("检测到 SSID：%s", ssid)
-                    return ssid or None
+        match = _NETSH_SSID_RE.search(result.stdout)
+        if match:
+            # netsh 输出使用系统代码页（中文系统为 GBK），仅解码 SSID 本身
+            ssid = match.group(1).decode(locale.getpreferredencoding(False), "replace")
+            logging.debug("检测到 SSID：%s", ssid)
+            return ssid or None
         logging.debug("未从 netsh 输出中解析到 SSID。")
         return None
 
     elif system == "darwin":  # macOS
+        # 0) CoreWLAN 进程内查询（无需子进程；新版系统未授权定位时可能返回空，再走命令行回退）
+        try:
+            ssid = _ssid_via_corewlan()
+            if ssid:
+                return ssid
+        except OSError as exc:
+            logging.debug("CoreWLAN 不可用，回退命令行：%s", exc)
+
         # 1) 尝试 airport -I（可读性更好）
-        airport_path = "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport"
-        out = _run_cmd([airport_path, "-I"])
-        if out:
-            for raw in out.splitlines():
-                line = raw.strip()
-                if line.lower().startswith("ssid:"):
-                    ssid = line.split(":", 1)[1].strip()
-                    logging.debug("airport 检测到 SSID：%s", ssid)
-                    return ssid or None
+        airport_path = _airport_path()
+        out = _run_cmd_fast([airport_path, "-I"]) if airport_path else None
+        match = _AIRPORT_SSID_RE.search(out) if out else None
+        if match:
+            ssid = match.group(1)
+            logging.debug("airport 检测到 SSID：%s", ssid)
+            return ssid or None
 
         # 2) 回退 networksetup -getairportnetwork en0/en1
         for iface in ("en0", "en1", "en2"):
-            out2 = _run_cmd(["networksetup", "-getairportnetwork", iface])
-            if out2 and ":" in out2:
-                ssid = out2.split(":", 1)[1].strip()
-                logging.debug("networksetup(%s) 检测到 SSID：%s", iface, ssid)
-                if ssid and ssid.lower() != "no network":
-                    return ssid
+            out2 = _run_cmd_fast(["networksetup", "-getairportnetwork", iface])
+            match = _NETWORKSETUP_SSID_RE.search(out2) if out2 else None
+            if match:
+                logging.debug("networksetup(%s) 检测到 SSID：%s", iface, match.group(1))
+                return match.group(1)
         logging.debug("未从 airport/networksetup 获取到 SSID。")
         return None
 
@@ -146,13 +552,19 @@ def get_current_ssid() -> Optional[str]:
 
 
 def has_internet_connectivity() -> bool:
-    """访问 INTERNET_TEST_URL，状态码 < 400 视为可用。"""
+    """对 INTERNET_TEST_URL 发 HEAD 请求（复用会话，不下载响应体），状态码 < 400 视为可用。"""
     try:
-        response = requests.get(
+        response = _SESSION.head(
             INTERNET_TEST_URL,
             timeout=REQUEST_TIMEOUT_SECONDS,
             allow_redirects=False,
         )
+        if response.status_code == 405:  # 个别站点不接受 HEAD，回退 GET
+            response = _SESSION.get(
+                INTERNET_TEST_URL,
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                allow_redirects=False,
+            )
         logging.debug("连通性检测返回状态码：%s", response.status_code)
         return response.status_code < 400
     except requests.RequestException as exc:
@@ -160,18 +572,174 @@ def has_internet_connectivity() -> bool:
         return False
 
 
-def has_quick_connectivity() -> bool:
-    """使用 TCP 直连 DNS 端口的方式进行亚秒级连通性探测。"""
+# 发往 FAST_DNS_HOST 的最小 DNS 查询：12 字节报头（RD=1，QDCOUNT=1）+ 根域名 "." 的 A/IN 问题
+_DNS_PROBE_QUERY = b"\x00\x00\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\x01\x00\x01"
+
+ONLINE_CACHE_TTL_SECONDS = 3.0  # 在线结果的缓存时长（秒），离线结果不缓存
+POST_LOGIN_WAIT_SECONDS = 10  # 提交登录后等待外网恢复的最长时间（秒）
+# HTTP 检测的最坏耗时：HEAD 与 405 回退的 GET 各自的连接超时 + 读取超时，再留 1 秒余量（含域名解析）
+HTTP_PROBE_BUDGET_SECONDS = 2 * 2 * REQUEST_TIMEOUT_SECONDS + 1
+_ONLINE_CACHE = {"ts": 0.0, "ok": False}
+
+
+_DNS_PROBE_SOCK: Optional[socket.socket] = None  # 复用的 UDP 探测套接字
+_DNS_PROBE_ID = [0]  # 递增的 DNS 报文 ID
+_DNS_PROBE_LOCK = threading.Lock()  # 探测可能在线程池中并发执行，串行化对共享套接字的收发
+DNS_MISS_LIMIT = 3  # PORTAL_DNS_FAST_OFFLINE 开启时，连续无应答达到该次数才判定离线
+_DNS_MISSES = [0]  # 连续无应答次数，任一应答或网络变化时清零
+_PROBE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="probe")  # 并行执行 DNS 与 HTTP 探测
+
+
+def _dns_confirms_offline() -> bool:
+    """探测一次并累计连续无应答次数，达到 DNS_MISS_LIMIT 时返回 True（供 PORTAL_DNS_FAST_OFFLINE 使用）。"""
+    with _DNS_PROBE_LOCK:
+        _DNS_MISSES[0] = 0 if _dns_probe() else _DNS_MISSES[0] + 1
+        return _DNS_MISSES[0] >= DNS_MISS_LIMIT
+
+
+def _dns_probe() -> bool:
+    """向 FAST_DNS_HOST 发一个 UDP DNS 查询（一个 RTT，无 TCP 握手），无应答返回 False；调用方需持有 _DNS_PROBE_LOCK。
+
+    门户认证前通常也会应答（甚至劫持）53 端口，UDP 报文也可能丢失或被封禁，
+    因此单次结果不能作为在线/离线依据，在线与否由 has_internet_connectivity() 决定。
+    """
+    global _DNS_PROBE_SOCK
     try:
-        with socket.create_connection((FAST_DNS_HOST, FAST_DNS_PORT), CONNECT_TIMEOUT_MS / 1000.0):
-            return True
+        if _DNS_PROBE_SOCK is None:
+            _DNS_PROBE_SOCK = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _DNS_PROBE_SOCK.settimeout(CONNECT_TIMEOUT_MS / 1000.0)
+        # 每次使用新的报文 ID，丢弃此前超时探测迟到的应答
+        _DNS_PROBE_ID[0] = (_DNS_PROBE_ID[0] + 1) & 0xFFFF
+        txid = _DNS_PROBE_ID[0].to_bytes(2, "big")
+        _DNS_PROBE_SOCK.sendto(txid + _DNS_PROBE_QUERY[2:], (FAST_DNS_HOST, FAST_DNS_PORT))
+        while _DNS_PROBE_SOCK.recvfrom(512)[0][:2] != txid:
+            pass
+        return True
+    except socket.timeout:
+        return False
     except OSError:
+        # 网络切换后旧套接字可能失效（如 ENETUNREACH），关闭后下次重建
+        if _DNS_PROBE_SOCK is not None:
+            _DNS_PROBE_SOCK.close()
+            _DNS_PROBE_SOCK = None
         return False
 
 
+def reset_online_cache() -> None:
+    """清除在线结果缓存与 DNS 连续无应答计数（网络变化时调用），下一次 is_online() 重新探测。"""
+    _ONLINE_CACHE["ok"] = False
+    _DNS_MISSES[0] = 0
+
+
 def is_online() -> bool:
-    """综合判定是否在线：先快速 TCP 探测，失败再回退 HTTP 检测。"""
-    return has_internet_connectivity()
+    """综合判定是否在线：ONLINE_CACHE_TTL_SECONDS 内的在线结果直接复用；否则以 HTTP 检测结果为准。
+
+    开启 PORTAL_DNS_FAST_OFFLINE 时并行执行 DNS 探测，连续 DNS_MISS_LIMIT 次无应答才不等 HTTP 直接判定离线；
+    DNS 应答不足以说明已通过门户认证，不会据此判定在线。
+    """
+    if _ONLINE_CACHE["ok"] and time.monotonic() - _ONLINE_CACHE["ts"] < ONLINE_CACHE_TTL_SECONDS:
+        return True
+    http = _PROBE_POOL.submit(has_internet_connectivity)
+    futures = [http]
+    if PORTAL_DNS_FAST_OFFLINE:
+        futures.append(_PROBE_POOL.submit(_dns_confirms_offline))
+    ok = False
+    try:
+        for future in as_completed(futures, timeout=HTTP_PROBE_BUDGET_SECONDS):
+            passed = future.exception() is None and future.result()
+            if future is http:
+                ok = passed
+                break
+            if passed:
+                break  # DNS 连续多次无应答：快速判定离线
+    except FuturesTimeoutError:
+        pass
+    for future in futures:
+        future.cancel()  # 未开始的探测直接取消；已在执行的不再等待
+    if ok:
+        _ONLINE_CACHE["ts"] = time.monotonic()
+        _ONLINE_CACHE["ok"] = True
+    return ok
+
+
+async def _await_online(timeout_s: float) -> bool:
+    """登录提交后等待外网恢复，最多 timeout_s 秒；判定规则同 is_online()，以 HTTP 检测确认后才返回 True。
+
+    开启 PORTAL_DNS_FAST_OFFLINE 时，DNS 连续无应答的轮次跳过 HTTP 检测，稍后重试。
+    探测放在 _PROBE_POOL 中执行，超时返回时 asyncio.run() 不必等待仍在进行的探测线程。
+    """
+    loop = asyncio.get_running_loop()
+
+    async def _probe_until_online() -> None:
+        while True:
+            if not (PORTAL_DNS_FAST_OFFLINE and await loop.run_in_executor(_PROBE_POOL, _dns_confirms_offline)):
+                if await loop.run_in_executor(_PROBE_POOL, has_internet_connectivity):
+                    return
+            await asyncio.sleep(0.1)
+
+    try:
+        await asyncio.wait_for(_probe_until_online(), timeout_s)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+# 通过 CDP 拦截的门户子资源（样式表保留：注销按钮的显隐判断依赖 CSS）
+_BLOCKED_URL_PATTERNS = [
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.svg",
+    "*.woff*",
+    "*.ttf",
+    "*/analytics*",
+]
+
+
+class _ReusableChromeService(ChromeService):
+    """常驻的 chromedriver 服务：进程存活时 start() 不再重复拉起，driver.quit() 触发的 stop() 也不关闭它。"""
+
+    def start(self) -> None:
+        process = getattr(self, "process", None)
+        if process is not None and process.poll() is None:
+            return
+        try:
+            super().start()
+        except BaseException:
+            self.shutdown()  # 启动失败时父类调用的 stop() 已被置空，这里补上清理
+            raise
+
+    def stop(self) -> None:
+        """保持 chromedriver 运行，真正的关闭由 shutdown() 在进程退出时执行。"""
+
+    def shutdown(self) -> None:
+        super().stop()
+
+
+_SERVICE: Optional[_ReusableChromeService] = None
+
+
+def _get_service() -> _ReusableChromeService:
+    """返回全局共享的 chromedriver 服务（首次调用时创建，由 webdriver.Chrome 负责首次启动）。"""
+    global _SERVICE
+    if _SERVICE is None:
+        if CHROMEDRIVER_PATH:
+            logging.info("使用指定 chromedriver：%s", CHROMEDRIVER_PATH)
+            _SERVICE = _ReusableChromeService(CHROMEDRIVER_PATH)
+        else:
+            logging.info("使用系统/缓存中的 chromedriver。")
+            _SERVICE = _ReusableChromeService()
+    return _SERVICE
+
+
+def _shutdown_service() -> None:
+    """进程退出时关闭常驻的 chromedriver。"""
+    if _SERVICE is not None and getattr(_SERVICE, "process", None) is not None:
+        _SERVICE.shutdown()
+
+
+atexit.register(_shutdown_service)
 
 
 def create_webdriver() -> webdriver.Chrome:
@@ -179,7 +747,7 @@ def create_webdriver() -> webdriver.Chrome:
     chrome_options = ChromeOptions()
     # 加快加载/渲染
     try:
-        chrome_options.page_load_strategy = "eager"  # DOM 完成即继续
+        chrome_options.page_load_strategy = "none"  # get() 立即返回，就绪由后续 XPath 轮询判断
     except Exception:
         pass
 
@@ -191,6 +759,29 @@ def create_webdriver() -> webdriver.Chrome:
     chrome_options.add_argument("--log-level=2")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
 
+    # 固定 profile + 关闭首次运行/后台服务，减少启动初始化开销
+    chrome_options.add_argument(f"--user-data-dir={CHROME_PROFILE_DIR}")
+    for flag in (
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-background-networking",
+        "--disable-sync",
+        "--disable-default-apps",
+        "--disable-extensions",
+        "--disable-translate",
+        "--disable-features=OptimizationHints,TranslateUI,BackForwardCache,MediaRouter",
+        "--disk-cache-size=0",  # 每次都是新会话，无需跨次 HTTP 缓存
+        "--metrics-recording-only",
+        "--disable-component-update",
+        "--disable-client-side-phishing-detection",
+        "--mute-audio",
+        "--disable-hang-monitor",
+    ):
+        chrome_options.add_argument(flag)
+    if PORTAL_CHROME_SINGLE_PROCESS:
+        chrome_options.add_argument("--single-process")
+        logging.info("以单进程模式启动 Chrome/Chromium。")
+
     # 指定浏览器二进制（Chromium/Chrome）
     if CHROME_BINARY_PATH:
         chrome_options.binary_location = CHROME_BINARY_PATH
@@ -213,23 +804,38 @@ def create_webdriver() -> webdriver.Chrome:
     }
     chrome_options.add_experimental_option("prefs", prefs)
 
-    # chromedriver 服务
-    if CHROMEDRIVER_PATH:
-        logging.info("使用指定 chromedriver：%s", CHROMEDRIVER_PATH)
-        service = ChromeService(CHROMEDRIVER_PATH)
-    else:
-        logging.info("使用系统/缓存中的 chromedriver。")
-        service = ChromeService()
+    # 与 chromedriver 的命令连接走 keep-alive 连接池（Selenium 4 的默认值，显式写出以免被改动）
+    driver = webdriver.Chrome(service=_get_service(), options=chrome_options, keep_alive=True)
+    _apply_asset_blocking(driver)
+    return driver
 
-    return webdriver.Chrome(service=service, options=chrome_options)
 
+def _apply_asset_blocking(driver: webdriver.Chrome) -> None:
+    """在当前标签页安装 CDP 资源拦截（Network.setBlockedURLs 只作用于当前 target，新标签需重新安装）。"""
+    if not PORTAL_BLOCK_ASSETS:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _BLOCKED_URL_PATTERNS})
+    except WebDriverException as exc:
+        logging.warning("设置 CDP 资源拦截失败：%s", exc)
+
+
+# 短超时等待的轮询间隔：默认 0.5 秒在 1~2 秒的等待里只采样几次，元素出现后平均还要多等约 250 毫秒
+WAIT_POLL_SECONDS = 0.05
+
+
+@functools.lru_cache(maxsize=8)
+def _wait(driver: webdriver.Chrome, timeout: float, poll_frequency: float = WAIT_POLL_SECONDS) -> WebDriverWait:
+    """按 (driver, timeout, poll_frequency) 复用 WebDriverWait 实例；浏览器重建时清空缓存。"""
+    return WebDriverWait(driver, timeout, poll_frequency=poll_frequency)
 
-def try_click(driver: webdriver.Chrome, xpath: str) -> bool:
-    """等待元素可点击并尝试点击，失败返回 False。"""
+
+def try_click(driver: webdriver.Chrome, locator: tuple) -> bool:
+    """等待元素可点击并尝试点击，失败返回 False。locator 形如 (By.XPATH, "...")。"""
+    xpath = locator[1]
     try:
-        element = WebDriverWait(driver, min(SELENIUM_TIMEOUT_SECONDS, 2)).until(
-            EC.element_to_be_clickable((By.XPATH, xpath))
-        )
+        element = _wait(driver, min(SELENIUM_TIMEOUT_SECONDS, 2)).until(EC.element_to_be_clickable(locator))
         element.click()
         logging.info("已点击元素：%s", xpath)
         return True
@@ -240,113 +846,85 @@ def try_click(driver: webdriver.Chrome, xpath: str) -> bool:
     return False
 
 
-def _locate_nearby_input(element) -> Optional[object]:
-    """在给定元素附近尝试找到可输入的 input/textarea。"""
-    try:
-        tag = element.tag_name.lower()
-    except Exception:
-        return None
-
-    if tag in {"input", "textarea"}:
-        return element
-
-    # 子孙 input
-    try:
-        descendants = element.find_elements(By.TAG_NAME, "input")
-        if descendants:
-            return descendants[0]
-    except Exception:
-        pass
+# 附近输入框的优先级：自身 -> 子孙 input -> following-sibling input -> preceding-sibling input -> 父级子树 input。
+# 后一级以前几级均未命中为前提（self::*[...] 过滤），保证并集结果只来自最高优先级的一组，取第一个即可。
+_NEARBY_INPUT_XPATH = " | ".join([
+    "self::input",
+    "self::textarea",
+    ".//input",
+    "self::*[not(self::input or self::textarea) and not(.//input)]/following-sibling::input[1]",
+    "self::*[not(self::input or self::textarea) and not(.//input) and not(following-sibling::input)]"
+    "/preceding-sibling::input[1]",
+    "self::*[not(self::input or self::textarea) and not(.//input) and not(following-sibling::input)"
+    " and not(preceding-sibling::input)]/../descendant::input[1]",
+])
 
-    # following-sibling input
-    try:
-        sib = element.find_element(By.XPATH, "following-sibling::input[1]")
-        return sib
-    except Exception:
-        pass
 
-    # preceding-sibling input
+def _locate_nearby_input(element) -> Optional[object]:
+    """在给定元素附近尝试找到可输入的 input/textarea（一次 find_elements 完成，未命中不抛异常）。"""
     try:
-        psib = element.find_element(By.XPATH, "preceding-sibling::input[1]")
-        return psib
-    except Exception:
-        pass
+        candidates = element.find_elements(By.XPATH, _NEARBY_INPUT_XPATH)
+    except WebDriverException:
+        return None
+    return candidates[0] if candidates else None
 
-    # 父级子树 input（常见容器层）
-    try:
-        parent = element.find_element(By.XPATH, "..")
-        maybe = parent.find_elements(By.XPATH, ".//input")
-        if maybe:
-            return maybe[0]
-    except Exception:
-        pass
 
-    return None
+# 单次 execute_script 完成滚动、聚焦、清空、赋值、触发 input/change 事件并返回最终值
+_JS_FILL = """
+const el = arguments[0], v = arguments[1];
+el.scrollIntoView({block: 'center'});
+el.focus();
+el.value = '';
+el.value = v;
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+return el.value;
+"""
 
 
-def fill_field(driver: webdriver.Chrome, xpath: str, value: str) -> bool:
-    """在指定 XPath 附近定位实际输入控件并填充值，失败返回 False。"""
+def fill_field(driver: webdriver.Chrome, locator: tuple, value: str) -> bool:
+    """在定位到的元素附近找到实际输入控件并填充值，失败返回 False。locator 形如 (By.XPATH, "...")。"""
+    xpath = locator[1]
     try:
-        element = WebDriverWait(driver, min(SELENIUM_TIMEOUT_SECONDS, 1)).until(
-            EC.presence_of_element_located((By.XPATH, xpath))
-        )
+        element = _wait(driver, min(SELENIUM_TIMEOUT_SECONDS, 1)).until(EC.presence_of_element_located(locator))
 
-        # 1) 直接/附近定位输入框
+        # 直接/附近定位输入框；"/label" 同级的 input 已由并集中的父级子树分支覆盖，无需再单独查询
         target = _locate_nearby_input(element)
-
-        # 2) 额外兜底：将提供的 /label 替换为 /input 再尝试
-        if target is None and xpath.endswith("/label"):
-            try:
-                alt_xpath = xpath[:-6] + "/input"
-                target = WebDriverWait(driver, 2).until(
-                    EC.presence_of_element_located((By.XPATH, alt_xpath))
-                )
-            except TimeoutException:
-                target = None
-
         if target is None:
             logging.error("未能定位输入控件：%s", xpath)
             return False
 
-        # 尝试点击聚焦
+        # 首选：单次脚本完成滚动、聚焦、清空、赋值、触发事件并返回最终值
         try:
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", target)
-        except Exception:
-            pass
-        try:
-            target.click()
-        except Exception:
-            pass
+            current_val = driver.execute_script(_JS_FILL, target, value)
+            if (current_val or "").strip() == value:
+                logging.info("已填充字段（JS set+events）：%s", xpath)
+                return True
+        except Exception as exc:
+            logging.debug("JS 填充异常，将尝试 CDP 方式：%s", exc)
 
-        # 清空并输入（send_keys 为首选）
+        # 回退：点击聚焦后用 CDP Input.insertText 一次写入整串
         try:
+            target.click()
             target.clear()
-        except Exception:
-            pass
-
-        try:
-            target.send_keys(value)
-            # 验证值是否写入
+            driver.execute_cdp_cmd("Input.insertText", {"text": value})
             current_val = target.get_attribute("value")
             if (current_val or "").strip() == value:
-                logging.info("已填充字段（send_keys）：%s", xpath)
+                logging.info("已填充字段（CDP insertText）：%s", xpath)
                 return True
         except Exception as exc:
-            logging.debug("send_keys 异常，将尝试 JS 方式：%s", exc)
+            logging.debug("CDP insertText 异常，将尝试 send_keys：%s", exc)
 
-        # 回退到 JS 直接赋值并触发事件
+        # 最后兜底：逐字符 send_keys（仅少数依赖真实按键事件的输入框需要）
         try:
-            driver.execute_script(
-                "arguments[0].value = arguments[1]; arguments[0].dispatchEvent(new Event('input', {bubbles:true})); arguments[0].dispatchEvent(new Event('change', {bubbles:true}));",
-                target,
-                value,
-            )
+            target.clear()
+            target.send_keys(value)
             current_val = target.get_attribute("value")
             if (current_val or "").strip() == value:
-                logging.info("已填充字段（JS set+events）：%s", xpath)
+                logging.info("已填充字段（send_keys）：%s", xpath)
                 return True
         except Exception as exc:
-            logging.error("通过 JS 填充字段失败：%s，原因：%s", xpath, exc)
+            logging.debug("send_keys 填充失败：%s", exc)
 
         logging.error("填充字段未生效：%s", xpath)
         return False
@@ -358,158 +936,465 @@ def fill_field(driver: webdriver.Chrome, xpath: str, value: str) -> bool:
     return False
 
 
-def hover_to_reveal(driver: webdriver.Chrome, target_xpath: str) -> bool:
-    """通过鼠标悬停与 JS 事件尝试让目标元素变为可见（兼容无头）。"""
-    candidate_xpaths = [
-        target_xpath,
-        "/html/body/div[1]/div[2]/ul",
-        "/html/body/div[1]/div[2]",
-    ]
+# 单次脚本完成：解析用户名/密码/登录按钮，定位附近输入框（规则同 _NEARBY_INPUT_XPATH）、赋值并点击登录
+_JS_SUBMIT_LOGIN = """
+const x = (p) => document.evaluate(p, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const nearby = (el) => {
+  if (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA') return el;
+  const d = el.querySelector('input');
+  if (d) return d;
+  for (let s = el.nextElementSibling; s; s = s.nextElementSibling) { if (s.tagName === 'INPUT') return s; }
+  for (let s = el.previousElementSibling; s; s = s.previousElementSibling) { if (s.tagName === 'INPUT') return s; }
+  return el.parentElement ? el.parentElement.querySelector('input') : null;
+};
+const fill = (el, v, name) => {
+  const t = nearby(el);
+  if (!t) return name + ' input not found';
+  t.focus();
+  t.value = v;
+  t.dispatchEvent(new Event('input', {bubbles: true}));
+  t.dispatchEvent(new Event('change', {bubbles: true}));
+  return t.value === v ? null : name + ' value not applied';
+};
+const u = x(arguments[0]), p = x(arguments[1]), b = x(arguments[2]);
+if (!u) return {ok: false, reason: 'username not found'};
+if (!p) return {ok: false, reason: 'password not found'};
+if (!b) return {ok: false, reason: 'login button not found'};
+const err = fill(u, arguments[3], 'username') || fill(p, arguments[4], 'password');
+if (err) return {ok: false, reason: err};
+const btn = (b.tagName === 'INPUT' || b.tagName === 'BUTTON') ? b : (b.querySelector('input,button') || b);
+btn.click();
+return {ok: true, reason: null};
+"""
+
+
+def _submit_login_js(
+    driver: webdriver.Chrome,
+    username_xpath: str,
+    password_xpath: str,
+    login_button_xpath: str,
+    username: str,
+    password: str,
+) -> bool:
+    """一次 execute_script 完成用户名、密码填充与登录点击；脚本返回 {ok, reason}，任一元素缺失或赋值未生效返回 False。"""
+    try:
+        result = driver.execute_script(
+            _JS_SUBMIT_LOGIN, username_xpath, password_xpath, login_button_xpath, username, password
+        ) or {}
+    except WebDriverException as exc:
+        logging.debug("单次脚本提交登录失败：%s", exc)
+        return False
+    if not result.get("ok"):
+        logging.info("单次脚本提交登录未完成（%s），回退逐项填充。", result.get("reason"))
+        return False
+    return True
+
+
+# 一次脚本完成：解析全部候选 XPath，对命中元素滚动到可视区、派发悬停事件并强制显示，最后返回目标（arguments[1]）是否可见
+_JS_HOVER_REVEAL = """
+const xpaths = arguments[0];
+const find = (xp) => document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+for (const xp of xpaths) {
+  const el = find(xp);
+  if (!el) continue;
+  el.scrollIntoView({block: 'center'});
+  ['mouseover', 'mousemove', 'mouseenter'].forEach(t => el.dispatchEvent(new MouseEvent(t, {bubbles: true})));
+  el.style.visibility = 'visible';
+  el.style.opacity = 1;
+  if (getComputedStyle(el).display === 'none') { el.style.display = 'block'; }
+}
+const target = find(arguments[1]);
+if (!target) return false;
+const style = getComputedStyle(target);
+return target.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+"""
 
-    deadline = time.time() + 0.5  # 最多尝试 ~0.5s
-    while time.time() < deadline:
-        for xp in candidate_xpaths:
-            try:
-                elem = driver.find_element(By.XPATH, xp)
-            except Exception:
-                continue
 
-            try:
-                driver.execute_script("arguments[0].scrollIntoView({block:'center'});", elem)
-            except Exception:
-                pass
+def hover_to_reveal(driver: webdriver.Chrome, target_xpath: str) -> bool:
+    """通过 JS 悬停事件与强制显示让目标元素变为可见（兼容无头），单次脚本返回目标是否可见。"""
+    candidate_xpaths = [target_xpath, *_REVEAL_CONTAINER_XPATHS]
+    try:
+        return bool(driver.execute_script(_JS_HOVER_REVEAL, candidate_xpaths, target_xpath))
+    except WebDriverException:
+        return False
 
-            try:
-                ActionChains(driver).move_to_element(elem).perform()
-            except Exception:
-                pass
 
-            for ev in ("mouseover", "mousemove", "mouseenter"):
-                try:
-                    driver.execute_script(
-                        "var e=new Event(arguments[1],{bubbles:true}); arguments[0].dispatchEvent(e);",
-                        elem,
-                        ev,
-                    )
-                except Exception:
-                    pass
+# 通过 CDP Runtime.evaluate 等待的 Promise：目标可见即 resolve(true)，否则由 MutationObserver 在每次 DOM 变化时复查，超时 resolve(false)
+_JS_OBSERVE_VISIBLE = """
+((xp, timeoutMs) => new Promise((resolve) => {
+  const visible = () => {
+    const el = document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!el) return false;
+    const style = getComputedStyle(el);
+    return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+  };
+  if (visible()) return resolve(true);
+  const observer = new MutationObserver(() => {
+    if (visible()) { observer.disconnect(); clearTimeout(timer); resolve(true); }
+  });
+  const timer = setTimeout(() => { observer.disconnect(); resolve(false); }, timeoutMs);
+  observer.observe(document.documentElement, {subtree: true, childList: true, attributes: true});
+}))
+"""
+
+
+def _wait_visible_cdp(driver: webdriver.Chrome, xpath: str, timeout_s: float) -> bool:
+    """等待 XPath 元素可见：DOM 变化时即刻得到通知，无固定轮询间隔；CDP 不可用时回退页面内轮询。"""
+    expression = f"{_JS_OBSERVE_VISIBLE}({json.dumps(xpath)}, {int(timeout_s * 1000)})"
+    try:
+        result = driver.execute_cdp_cmd(
+            "Runtime.evaluate",
+            {"expression": expression, "awaitPromise": True, "returnByValue": True},
+        )
+    except WebDriverException as exc:
+        logging.debug("CDP 等待元素失败，回退轮询：%s", exc)
+        return _wait_xpaths_js(driver, [xpath], timeout_s, visible=True)
+    if "exceptionDetails" in result:
+        return _wait_xpaths_js(driver, [xpath], timeout_s, visible=True)
+    return bool(result.get("result", {}).get("value"))
 
-            try:
-                driver.execute_script(
-                    "arguments[0].style.visibility='visible'; arguments[0].style.opacity=1; if (getComputedStyle(arguments[0]).display==='none'){arguments[0].style.display='block';}",
-                    elem,
-                )
-            except Exception:
-                pass
 
-            try:
-                if WebDriverWait(driver, 0.5).until(
-                        EC.visibility_of_element_located((By.XPATH, target_xpath))
-                ):
-                    return True
-            except Exception:
-                continue
-        time.sleep(0.05)
-    return False
+def _wait_logout_done(driver: webdriver.Chrome) -> None:
+    """等待注销按钮消失或失效（注销请求已生效、页面已切换），最多 3 秒，超时不视为失败。"""
+    try:
+        _wait(driver, 3).until(EC.invisibility_of_element_located(_LOGOUT_LOC))
+    except TimeoutException:
+        logging.debug("注销后按钮仍可见，继续后续流程。")
 
 
 def attempt_logout(driver: webdriver.Chrome, retries: int = 2) -> bool:
     """尝试点击注销按钮，必要时先 hover/强制显示，再重试点击（含 JS 点击兜底）。"""
-    logout_xpath = "/html/body/div[1]/div[2]/ul/li[2]/span"
-
     for i in range(max(1, retries)):
-        # 先尝试通过 hover/JS 让其可见
-        hover_to_reveal(driver, logout_xpath)
+        # 先尝试通过 hover/JS 让其可见，未立即可见则等待 DOM 变化（最多 0.5s）
+        if not hover_to_reveal(driver, _LOGOUT_XPATH):
+            _wait_visible_cdp(driver, _LOGOUT_XPATH, 0.5)
 
         # 优先常规点击
-        if try_click(driver, logout_xpath):
+        if try_click(driver, _LOGOUT_LOC):
             logging.info("第 %s 次尝试：已触发注销。", i + 1)
-            time.sleep(0.2)
+            _wait_logout_done(driver)
             return True
 
         # 兜底：JS 直接点击
         try:
-            elem = driver.find_element(By.XPATH, logout_xpath)
+            elem = driver.find_element(*_LOGOUT_LOC)
             driver.execute_script("arguments[0].click();", elem)
             logging.info("第 %s 次尝试：已通过 JS click 触发注销。", i + 1)
-            time.sleep(0.2)
+            _wait_logout_done(driver)
             return True
         except Exception:
             pass
 
-        time.sleep(0.05)
-
     logging.info("未发现可点击的注销按钮。")
     return False
 
 
 def open_portal_fresh_tab(driver: webdriver.Chrome) -> None:
-    """在新标签页打开门户并切换过去，尽量保持一个活跃标签。"""
+    """在新标签页打开门户并切换过去，尽量保持一个活跃标签；先在空白新标签装好资源拦截再导航。"""
     try:
-        driver.execute_script("window.open(arguments[0], '_blank');", PORTAL_URL)
-        driver.switch_to.window(driver.window_handles[-1])
-        logging.info("已在新标签页打开门户：%s", PORTAL_URL)
+        driver.switch_to.new_window("tab")
+        _apply_asset_blocking(driver)
+        driver.get(CFG.portal_url)
+        logging.info("已在新标签页打开门户：%s", CFG.portal_url)
     except WebDriverException as exc:
         logging.warning("打开新标签失败，退回到当前标签刷新：%s", exc)
-        driver.get(PORTAL_URL)
+        driver.get(CFG.portal_url)
+
+
+# 在页面内轮询：arguments[0] 中所有 XPath 节点均出现（visible 为真时还需可见）即回调 true，超时回调 false
+_JS_WAIT_XPATHS = """
+const done = arguments[arguments.length - 1];
+const xpaths = arguments[0], deadline = Date.now() + arguments[1] * 1000, visible = arguments[2];
+const ready = (xp) => {
+  const el = document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  if (!el) return false;
+  if (!visible) return true;
+  const style = getComputedStyle(el);
+  return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+};
+(function poll() {
+  if (xpaths.every(ready)) return done(true);
+  if (Date.now() > deadline) return done(false);
+  setTimeout(poll, 50);
+})();
+"""
+
+
+def _wait_xpaths_js(driver: webdriver.Chrome, xpaths: list[str], timeout_s: float, visible: bool = False) -> bool:
+    """用一次异步脚本在浏览器内轮询多个 XPath，代替多次 WebDriverWait 往返。"""
+    deadline = time.monotonic() + timeout_s
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            driver.set_script_timeout(remaining + 2)
+            return bool(driver.execute_async_script(_JS_WAIT_XPATHS, xpaths, remaining, visible))
+        except TimeoutException:
+            return False
+        except JavascriptException:
+            # 页面加载策略为 none，脚本可能落在即将被替换的旧文档上（document unloaded），在新文档上重试
+            time.sleep(0.05)
 
 
 def wait_for_login_form(driver: webdriver.Chrome, timeout_s: int = 8) -> bool:
     """等待用户名与密码区域出现，以判断处于登录页。"""
-    username_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[1]/label"
-    password_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[2]/label"
+    return _wait_xpaths_js(driver, [_USERNAME_XPATH, _PASSWORD_XPATH], timeout_s)
+
+
+# 导航前给当前文档的 window 打标记；新文档提交后标记随旧 window 一起消失，据此区分新旧页面
+_MARK_STALE_JS = "window.__portalStale = true;"
+_DOM_READY_JS = "return !window.__portalStale && document.readyState !== 'loading';"
+
+
+def mark_document_stale(driver: webdriver.Chrome) -> None:
+    """标记当前文档即将被替换，之后的就绪检测只认新文档。"""
     try:
-        WebDriverWait(driver, timeout_s).until(
-            EC.presence_of_element_located((By.XPATH, username_xpath))
-        )
-        WebDriverWait(driver, timeout_s).until(
-            EC.presence_of_element_located((By.XPATH, password_xpath))
-        )
+        driver.execute_script(_MARK_STALE_JS)
+    except WebDriverException as exc:
+        logging.debug("标记当前文档失败：%s", exc)
+
+
+def wait_for_dom_ready(driver: webdriver.Chrome, timeout_s: float = 8) -> bool:
+    """等待新文档提交并脱离 loading 状态（页面加载策略为 none，driver.get() 返回时旧页面可能仍在）。
+
+    导航前需先调用 mark_document_stale()；脚本落在正在卸载的旧文档上抛出的 JavascriptException 视为尚未就绪。
+    """
+    try:
+        WebDriverWait(
+            driver, timeout_s, poll_frequency=WAIT_POLL_SECONDS, ignored_exceptions=(JavascriptException,)
+        ).until(lambda d: d.execute_script(_DOM_READY_JS))
         return True
     except TimeoutException:
+        logging.debug("等待页面 DOM 就绪超时。")
         return False
 
 
+def _stop_loading(driver: webdriver.Chrome) -> None:
+    """通过 CDP Page.stopLoading 中止页面剩余的子资源加载（统计像素、慢图片等），失败忽略。
+
+    页面加载策略为 none，文档仍在解析（readyState 为 loading）时不中止，以免打断阻塞脚本或截断尚未解析的节点。
+    """
+    try:
+        if driver.execute_script("return document.readyState") == "loading":
+            logging.debug("页面仍在解析，跳过 Page.stopLoading。")
+            return
+        driver.execute_cdp_cmd("Page.stopLoading", {})
+    except WebDriverException as exc:
+        logging.debug("Page.stopLoading 失败：%s", exc)
+
+
 def is_login_form_present(driver: webdriver.Chrome, quick_timeout_s: int = 1) -> bool:
     """快速判断是否在登录页面（两个输入区域出现）。"""
     return wait_for_login_form(driver, timeout_s=quick_timeout_s)
 
 
+# 读取标题与关键节点是否存在：arguments[0] 为注销按钮 XPath，arguments[1] 为用户名区域 XPath
+_JS_PAGE_STATE = """
+const has = (xp) => !!document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+return {title: document.title, hasLogout: has(arguments[0]), hasUser: has(arguments[1])};
+"""
+
+
 def is_logged_in(driver: webdriver.Chrome, quick_timeout_s: int = 1) -> bool:
     """快速判断是否已登录：通过 hover 显示并检查注销按钮是否可见。"""
-    logout_xpath = "/html/body/div[1]/div[2]/ul/li[2]/span"
-    hover_to_reveal(driver, logout_xpath)
+    # 快速路径：一次脚本读取页面状态，登录表单/注销按钮任一明确存在时不再 hover 等待
     try:
-        WebDriverWait(driver, quick_timeout_s).until(
-            EC.visibility_of_element_located((By.XPATH, logout_xpath))
-        )
+        state = driver.execute_script(_JS_PAGE_STATE, _LOGOUT_XPATH, _USERNAME_XPATH)
+    except WebDriverException:
+        state = None
+    if state:
+        logging.debug("门户页面状态：title=%s，注销=%s，登录表单=%s", state["title"], state["hasLogout"], state["hasUser"])
+        if state["hasUser"]:
+            return False
+        if state["hasLogout"]:
+            return True
+
+    if hover_to_reveal(driver, _LOGOUT_XPATH):
         return True
-    except TimeoutException:
-        return False
+    return _wait_visible_cdp(driver, _LOGOUT_XPATH, quick_timeout_s)
+
+
+_DRIVER: Optional[webdriver.Chrome] = None  # 复用的浏览器实例，避免每次登录冷启动 Chrome
+_DRIVER_LOCK = threading.Lock()
+
+
+def _get_or_create_driver() -> webdriver.Chrome:
+    """返回缓存的 WebDriver（先用 driver.title 做一次廉价健康检查），不存在或已失效时重新创建并缓存。"""
+    global _DRIVER
+    with _DRIVER_LOCK:
+        if _DRIVER is not None:
+            try:
+                _ = _DRIVER.title
+            except WebDriverException as exc:
+                logging.warning("缓存的浏览器会话已失效，重新创建：%s", exc)
+                try:
+                    _DRIVER.quit()
+                except WebDriverException:
+                    pass
+                _DRIVER = None
+                _wait.cache_clear()
+        if _DRIVER is None:
+            _DRIVER = create_webdriver()
+            _DRIVER.set_page_load_timeout(max(SELENIUM_TIMEOUT_SECONDS, 2))
+            logging.info("浏览器实例已创建，后续登录将复用。")
+        return _DRIVER
+
+
+def _shutdown_driver() -> None:
+    """关闭并清空缓存的 WebDriver（会话异常或进程退出时调用）。"""
+    global _DRIVER
+    with _DRIVER_LOCK:
+        driver, _DRIVER = _DRIVER, None
+    _wait.cache_clear()  # 释放绑定在旧浏览器上的 WebDriverWait
+    if driver is None:
+        return
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+    logging.info("浏览器实例已关闭。")
+
+
+def _reset_driver(driver: webdriver.Chrome) -> None:
+    """登录流程结束后清理复用的浏览器：只留一个标签、清 Cookie、回到空白页。"""
+    if driver is not _DRIVER:
+        return
+    try:
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+    except WebDriverException as exc:
+        logging.warning("重置浏览器状态失败，下次登录将重建：%s", exc)
+        _shutdown_driver()
+
+
+atexit.register(_shutdown_driver)
+
+
+class _LoginFormParser(HTMLParser):
+    """从门户页面中提取含密码框的登录表单：action、method 与各输入框的默认值。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.forms: list[dict] = []
+        self._current: Optional[dict] = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attr = {k: (v or "") for k, v in attrs}
+        if tag == "form":
+            self._current = {
+                "action": attr.get("action", ""),
+                "method": attr.get("method", "get").lower(),
+                "fields": {},
+                "user_field": None,
+                "pass_field": None,
+            }
+        elif tag == "input" and self._current is not None and attr.get("name"):
+            name = attr["name"]
+            input_type = attr.get("type", "text").lower()
+            if input_type == "password":
+                self._current["pass_field"] = self._current["pass_field"] or name
+            elif input_type in {"text", "email", "tel"}:
+                self._current["user_field"] = self._current["user_field"] or name
+            elif input_type not in {"submit", "button", "reset", "image", "checkbox", "radio"}:
+                self._current["fields"][name] = attr.get("value", "")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "form" and self._current is not None:
+            if self._current["pass_field"]:
+                self.forms.append(self._current)
+            self._current = None
+
+
+def _login_via_http(session: requests.Session, username: str, password: str) -> Optional[bool]:
+    """不启动浏览器，直接 GET 门户页（带回会话 Cookie）并 POST 其登录表单。
+
+    外网恢复返回 True；表单已成功提交（状态码 < 400）但 POST_LOGIN_WAIT_SECONDS 内仍离线返回 False；
+    未能提交（无可解析的表单、表单不是 POST 或提交地址不在门户主机上、请求失败或状态码异常）返回 None。
+    """
+    try:
+        page = session.get(CFG.portal_url, timeout=REQUEST_TIMEOUT_SECONDS)
+        parser = _LoginFormParser()
+        parser.feed(page.text)
+        if not parser.forms:
+            logging.info("门户页面未解析到登录表单（可能由脚本渲染）。")
+            return None
+        form = parser.forms[0]
+        action = urljoin(page.url, form["action"] or page.url)
+        # 密码只以 POST 发往门户自身：GET 会把密码放进查询串，跳转到其他主机的表单也不可信
+        if form["method"] != "post":
+            logging.info("门户登录表单不是 POST 提交（method=%s），交由浏览器流程处理。", form["method"])
+            return None
+        portal_host = urlsplit(CFG.portal_url).hostname
+        if urlsplit(action).hostname != portal_host:
+            logging.warning("登录表单提交地址 %s 不在门户主机 %s 上，放弃 HTTP 直登。", action, portal_host)
+            return None
+        data = dict(form["fields"])
+        if form["user_field"]:
+            data[form["user_field"]] = username
+        data[form["pass_field"]] = password
+        logging.info("通过 HTTP 提交登录表单：%s", action)
+        response = session.post(action, data=data, timeout=REQUEST_TIMEOUT_SECONDS)
+    except requests.RequestException as exc:
+        logging.info("HTTP 直登请求失败：%s", exc)
+        return None
 
+    if response.status_code >= 400:
+        logging.info("HTTP 直登返回异常状态码：%s", response.status_code)
+        return None
+    if asyncio.run(_await_online(POST_LOGIN_WAIT_SECONDS)):
+        logging.info("HTTP 直登成功，网络连通性恢复。")
+        return True
+    logging.warning("HTTP 直登已提交，但 %s 秒内网络仍不可用。", POST_LOGIN_WAIT_SECONDS)
+    return False
+
+
+def handle_portal_login_fast() -> Optional[bool]:
+    """不启动浏览器，用复用的 HTTP 会话直接提交门户登录表单；返回值含义同 _login_via_http()。
+
+    返回 None（缺少认证信息或未能提交表单）时由调用方回退 handle_portal_login()；返回 False 时表单已提交，
+    回退浏览器流程须传 allow_logout=False，避免注销刚建立的会话。
+    """
+    cfg = CFG
+    if not cfg.username or not cfg.password:
+        return None
+    return _login_via_http(_SESSION, cfg.username, cfg.password)
 
-def handle_portal_login() -> None:
-    """执行门户登录流程：先打开门户，优先快速判断已登录；否则再判断登录页并处理。"""
-    username = os.getenv(USERNAME_ENV)
-    password = os.getenv(PASSWORD_ENV)
 
-    if not username or not password:
+def handle_portal_login(allow_logout: bool = True) -> None:
+    """执行浏览器门户登录流程；allow_logout 为 False 时检测到已登录即结束，不注销重登。"""
+    cfg = CFG
+    if not cfg.username or not cfg.password:
         logging.error("缺少认证信息，请设置环境变量 %s 和 %s。", USERNAME_ENV, PASSWORD_ENV)
         return
 
+    _login_via_browser(cfg.username, cfg.password, allow_logout)
+
+
+def _login_via_browser(username: str, password: str, allow_logout: bool = True) -> None:
+    """浏览器登录流程：先打开门户，优先快速判断已登录；否则再判断登录页并处理。"""
     try:
-        driver = create_webdriver()
+        driver = _get_or_create_driver()
     except WebDriverException as exc:
         logging.error("初始化 WebDriver 失败：%s", exc)
         return
 
     try:
-        driver.set_page_load_timeout(max(SELENIUM_TIMEOUT_SECONDS, 2))
-        logging.info("访问门户页面：%s", PORTAL_URL)
-        driver.get(PORTAL_URL)
+        logging.info("访问门户页面：%s", CFG.portal_url)
+        mark_document_stale(driver)
+        driver.get(CFG.portal_url)
+        wait_for_dom_ready(driver)  # 否则下面的快速判断读到的是上一页（about:blank）
 
         # 先快速判断已登录（更省时）
         if is_logged_in(driver, quick_timeout_s=1):
+            if not allow_logout:
+                logging.info("门户显示已登录（HTTP 直登已提交），不注销，等待下一轮检测。")
+                return
             logging.info("检测到已登录状态，开始注销。")
             attempt_logout(driver, retries=3)
             open_portal_fresh_tab(driver)
@@ -522,6 +1407,9 @@ def handle_portal_login() -> None:
                 # 打开新标签页尝试进入登录页
                 open_portal_fresh_tab(driver)
                 if not wait_for_login_form(driver, timeout_s=6):
+                    if not allow_logout:
+                        logging.error("未能进入登录页，放弃本次流程。")
+                        return
                     # 再尝试一次注销并进入登录页
                     attempt_logout(driver, retries=2)
                     open_portal_fresh_tab(driver)
@@ -529,59 +1417,306 @@ def handle_portal_login() -> None:
                         logging.error("未能进入登录页，放弃本次流程。")
                         return
 
-        # 2) 填写用户名与密码，并点击登录
-        username_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[1]/label"
-        password_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[3]/ul/li[2]/label"
-        login_button_xpath = "/html/body/div[2]/div[1]/div/div[3]/div[5]/div[1]/input"
+        # 登录表单已可交互，不再等待页面剩余资源
+        _stop_loading(driver)
 
-        if not fill_field(driver, username_xpath, username):
-            logging.error("填充用户名失败，终止流程。")
-            return
-        if not fill_field(driver, password_xpath, password):
-            logging.error("填充密码失败，终止流程。")
-            return
+        # 2) 填写用户名与密码，并点击登录
+        if _submit_login_js(driver, _USERNAME_XPATH, _PASSWORD_XPATH, _LOGIN_BTN_XPATH, username, password):
+            logging.info("已通过单次脚本填充并提交登录表单。")
+        else:
+            # 回退逐个元素的填充与点击
+            if not fill_field(driver, _USERNAME_LOC, username):
+                logging.error("填充用户名失败，终止流程。")
+                return
+            if not fill_field(driver, _PASSWORD_LOC, password):
+                logging.error("填充密码失败，终止流程。")
+                return
 
-        if not try_click(driver, login_button_xpath):
-            logging.error("点击登录按钮失败。")
-            return
+            if not try_click(driver, _LOGIN_BTN_LOC):
+                logging.error("点击登录按钮失败。")
+                return
 
         logging.info("登录已提交，开始快速轮询网络连通性。")
-        start_ts = time.time()
-        while time.time() - start_ts < 10:
-            if is_online():
-                logging.info("网络连通性恢复。")
-                break
-            time.sleep(0.5)
+        if asyncio.run(_await_online(POST_LOGIN_WAIT_SECONDS)):
+            logging.info("网络连通性恢复。")
+            _stop_loading(driver)  # 登录后的跳转页无需加载完成
+        else:
+            logging.warning("登录提交后 %s 秒内网络仍不可用。", POST_LOGIN_WAIT_SECONDS)
+    except WebDriverException as exc:
+        logging.warning("浏览器会话异常，下次登录将重建：%s", exc)
+        _shutdown_driver()
+        invalidate_ssid_cache()  # 会话异常常伴随网络切换，下一轮重新读取 SSID
     finally:
-        driver.quit()
-        logging.info("浏览器实例已关闭。")
+        _reset_driver(driver)
+
+
+# ---- 网络变化监听：各平台回调把事件投递到队列，主循环据此提前唤醒，定时检测仅作兜底心跳 ----
+# SimpleQueue 的 put 可重入，信号处理函数（SIGUSR1）也能安全投递
+_NETWORK_EVENTS: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+
+# Windows：NotifyNetworkConnectivityHintChange 回调参数
+class _NL_NETWORK_CONNECTIVITY_HINT(ctypes.Structure):
+    _fields_ = [
+        ("ConnectivityLevel", ctypes.c_int),
+        ("ConnectivityCost", ctypes.c_int),
+        ("ApproachingDataLimit", ctypes.c_ubyte),
+        ("OverDataLimit", ctypes.c_ubyte),
+        ("Roaming", ctypes.c_ubyte),
+    ]
+
+
+# 已注册的回调/句柄需一直持有引用，防止被垃圾回收
+_WATCH_REFS: list = []
+
+
+def _watch_windows() -> bool:
+    """Windows：注册网络连通性提示变化与 WLAN 连接/断开通知，任一成功返回 True。"""
+    callback_type = ctypes.WINFUNCTYPE  # 仅 Windows 提供
+    registered = False
+
+    # 1) iphlpapi!NotifyNetworkConnectivityHintChange（Windows 10 2004+）
+    try:
+        iphlpapi = ctypes.WinDLL("iphlpapi")
+        hint_callback_type = callback_type(None, ctypes.c_void_p, _NL_NETWORK_CONNECTIVITY_HINT)
+        iphlpapi.NotifyNetworkConnectivityHintChange.argtypes = [
+            hint_callback_type,
+            ctypes.c_void_p,
+            ctypes.c_ubyte,
+            ctypes.POINTER(ctypes.c_void_p),
+        ]
+        iphlpapi.NotifyNetworkConnectivityHintChange.restype = ctypes.c_uint32
+
+        def _on_hint(_context, _hint) -> None:
+            _NETWORK_EVENTS.put("connectivity-hint")
+
+        hint_callback = hint_callback_type(_on_hint)
+        hint_handle = ctypes.c_void_p()
+        ret = iphlpapi.NotifyNetworkConnectivityHintChange(hint_callback, None, 0, ctypes.byref(hint_handle))
+        if ret == _ERROR_SUCCESS:
+            _WATCH_REFS.extend([iphlpapi, hint_callback, hint_handle])
+            registered = True
+            logging.info("已注册网络连通性变化通知。")
+        else:
+            logging.info("NotifyNetworkConnectivityHintChange 调用失败（%s）。", ret)
+    except (OSError, AttributeError) as exc:
+        logging.info("网络连通性变化通知不可用：%s", exc)
+
+    # 2) wlanapi!WlanRegisterNotification（ACM 连接完成/断开）
+    try:
+        wlanapi = _load_wlanapi()
+
+        def _on_wlan(data, _context) -> None:
+            notification = data.contents
+            if notification.NotificationSource == _WLAN_NOTIFICATION_SOURCE_ACM and notification.NotificationCode in (
+                _WLAN_NOTIFICATION_ACM_CONNECTION_COMPLETE,
+                _WLAN_NOTIFICATION_ACM_DISCONNECTED,
+            ):
+                _NETWORK_EVENTS.put("wlan")
+
+        wlan_callback = _WLAN_NOTIFICATION_CALLBACK(_on_wlan)
+        negotiated_version = wintypes.DWORD()
+        wlan_handle = wintypes.HANDLE()
+        ret = wlanapi.WlanOpenHandle(_WLAN_CLIENT_VERSION, None, ctypes.byref(negotiated_version), ctypes.byref(wlan_handle))
+        if ret == _ERROR_SUCCESS:
+            ret = wlanapi.WlanRegisterNotification(
+                wlan_handle, _WLAN_NOTIFICATION_SOURCE_ACM, 1, wlan_callback, None, None, None
+            )
+        if ret == _ERROR_SUCCESS:
+            _WATCH_REFS.extend([wlan_callback, wlan_handle])
+            registered = True
+            logging.info("已注册 WLAN 连接状态通知。")
+        else:
+            logging.info("WLAN 通知注册失败（%s）。", ret)
+    except (OSError, AttributeError) as exc:
+        logging.info("WLAN 通知不可用：%s", exc)
+
+    return registered
+
+
+def _watch_macos() -> bool:
+    """macOS：通过 SCNetworkReachability（pyobjc）监听到 FAST_DNS_HOST 的可达性变化。"""
+    try:
+        import SystemConfiguration  # pyobjc-framework-SystemConfiguration
+        from CoreFoundation import CFRunLoopGetCurrent, CFRunLoopRun, kCFRunLoopDefaultMode
+    except ImportError:
+        logging.info("未安装 pyobjc-framework-SystemConfiguration，网络变化监听不可用。")
+        return False
+
+    target = SystemConfiguration.SCNetworkReachabilityCreateWithName(None, FAST_DNS_HOST.encode())
+    if target is None:
+        logging.info("创建 SCNetworkReachability 失败，网络变化监听不可用。")
+        return False
+
+    def _on_change(_target, _flags, _info) -> None:
+        _NETWORK_EVENTS.put("reachability")
+
+    if not SystemConfiguration.SCNetworkReachabilitySetCallback(target, _on_change, None):
+        logging.info("SCNetworkReachabilitySetCallback 失败，网络变化监听不可用。")
+        return False
+
+    def _run_loop() -> None:
+        SystemConfiguration.SCNetworkReachabilityScheduleWithRunLoop(
+            target, CFRunLoopGetCurrent(), kCFRunLoopDefaultMode
+        )
+        CFRunLoopRun()
+
+    _WATCH_REFS.extend([target, _on_change])
+    threading.Thread(target=_run_loop, name="reachability-watcher", daemon=True).start()
+    logging.info("已启动网络可达性变化监听。")
+    return True
+
+
+def _watch_corewlan() -> bool:
+    """macOS：通过 CoreWLAN 事件代理监听 SSID / 链路 / 电源变化（回调由 CoreWLAN 的私有队列投递）。"""
+    if CWWiFiClient is None:
+        return False
+    try:
+        import CoreWLAN
+        from Foundation import NSObject
+    except ImportError:
+        return False
+
+    class _WiFiEventDelegate(NSObject):
+        """CWEventDelegate：任一 WiFi 事件都投递到网络事件队列。"""
+
+        def ssidDidChangeForWiFiInterfaceWithName_(self, _interface_name):
+            _NETWORK_EVENTS.put("ssid")
+
+        def linkDidChangeForWiFiInterfaceWithName_(self, _interface_name):
+            _NETWORK_EVENTS.put("wifi-link")
+
+        def powerStateDidChangeForWiFiInterfaceWithName_(self, _interface_name):
+            _NETWORK_EVENTS.put("wifi-power")
+
+    client = CWWiFiClient.sharedWiFiClient()
+    delegate = _WiFiEventDelegate.alloc().init()
+    client.setDelegate_(delegate)
+    monitoring = False
+    for event_type in (
+        CoreWLAN.CWEventTypeSSIDDidChange,
+        CoreWLAN.CWEventTypeLinkDidChange,
+        CoreWLAN.CWEventTypePowerDidChange,
+    ):
+        ok, error = client.startMonitoringEventWithType_error_(event_type, None)
+        if ok:
+            monitoring = True
+        else:
+            logging.info("CoreWLAN 事件监听注册失败（type=%s）：%s", event_type, error)
+    if not monitoring:
+        return False
+
+    _WATCH_REFS.extend([client, delegate])
+    logging.info("已启动 WiFi SSID 变化监听。")
+    return True
+
+
+def start_network_watchers() -> bool:
+    """按平台启动网络变化监听，成功返回 True；失败时主循环退回纯定时检测。"""
+    system = _SYSTEM
+    if system == "windows":
+        return _watch_windows()
+    if system == "darwin":
+        reachability = _watch_macos()
+        wifi_events = _watch_corewlan()
+        return reachability or wifi_events
+    return False
+
+
+def wait_for_network_event(timeout_s: float) -> Optional[str]:
+    """阻塞等待网络变化事件，最多 timeout_s 秒；返回事件名（合并积压的同批事件），超时返回 None。"""
+    try:
+        event = _NETWORK_EVENTS.get(timeout=timeout_s)
+    except queue.Empty:
+        return None
+    invalidate_ssid_cache()
+    reset_online_cache()
+    while True:
+        try:
+            _NETWORK_EVENTS.get_nowait()
+        except queue.Empty:
+            return event
+
+
+def _install_signal_handlers() -> None:
+    """POSIX 下：SIGHUP 重新加载配置，SIGUSR1 立即触发一次检测，SIGTERM 直接退出等待并执行 atexit 清理。
+
+    信号处理函数里不写日志（会重入日志处理器的锁），只置位/投递事件，实际工作交给主循环。
+    """
+    def _hangup(_signum, _frame) -> None:
+        _RELOAD_REQUESTED[0] = True
+        _NETWORK_EVENTS.put("SIGHUP")
+
+    def _kick(_signum, _frame) -> None:
+        _NETWORK_EVENTS.put("SIGUSR1")
+
+    def _terminate(_signum, _frame) -> None:
+        raise SystemExit(0)
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _hangup)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, _kick)
+    signal.signal(signal.SIGTERM, _terminate)
 
 
 def main_loop() -> None:
-    """前台循环运行：仅当连接到目标 SSID 且无外网连通性时执行登录流程。"""
+    """前台循环运行：仅当连接到目标 SSID 且无外网连通性时执行登录流程。
+
+    已启用网络变化监听时，网络正常后阻塞等待系统事件（最长 PORTAL_HEARTBEAT_INTERVAL 秒兜底）；
+    否则按 PORTAL_CHECK_INTERVAL 定时检测。断网或非目标 WiFi 时检测间隔指数退避至 PORTAL_MAX_BACKOFF，
+    网络恢复或收到网络变化事件时重置。
+    """
     setup_logging()
     system_name = platform.system()
     logging.info("前台模式启动(%s)。目标 WiFi：%s，检测间隔：%s 秒，Headless=%s",
-                 system_name, TARGET_WIFI_SSID, CHECK_INTERVAL_SECONDS, PORTAL_HEADLESS)
+                 system_name, CFG.ssid, CHECK_INTERVAL_SECONDS, PORTAL_HEADLESS)
+    _install_signal_handlers()
+
+    watching = start_network_watchers()
+    idle_timeout = HEARTBEAT_SECONDS if watching else CHECK_INTERVAL_SECONDS
+    backoff = CHECK_INTERVAL_SECONDS
 
     while True:
+        healthy = False
         try:
-            ssid = TARGET_WIFI_SSID#get_current_ssid()
-            if ssid == TARGET_WIFI_SSID:
+            target_ssid = CFG.ssid
+            ssid = target_ssid  # get_current_ssid()：新版 macOS 上 SSID 常获取失败，按 README 直接使用设置的 WiFi 名称
+            if ssid == target_ssid:
                 logging.debug("当前连接到目标 WiFi：%s", ssid)
                 if is_online():
                     logging.info("网络连通性正常，无需操作。")
-                    time.sleep(CHECK_INTERVAL_SECONDS)
-                    continue
+                    healthy = True
                 else:
                     logging.warning("检测到网络不可用，开始门户自动登录流程。")
-                    handle_portal_login()
+                    if PORTAL_USE_BROWSER:
+                        handle_portal_login()
+                    else:
+                        result = handle_portal_login_fast()
+                        if result is None:
+                            logging.info("HTTP 直登未成功，回退浏览器登录流程。")
+                            handle_portal_login()
+                        elif not result:
+                            logging.info("HTTP 直登已提交但网络未恢复，回退浏览器登录流程（不注销）。")
+                            handle_portal_login(allow_logout=False)
             else:
-                logging.debug("当前 SSID(%s) 非目标 WiFi(%s)，跳过。", ssid, TARGET_WIFI_SSID)
+                logging.debug("当前 SSID(%s) 非目标 WiFi(%s)，跳过。", ssid, target_ssid)
         except Exception as exc:  # pylint: disable=broad-except
             logging.exception("循环执行出现异常：%s", exc)
 
-        time.sleep(CHECK_INTERVAL_SECONDS)
+        if healthy:
+            backoff = CHECK_INTERVAL_SECONDS
+            timeout = idle_timeout
+        else:
+            timeout = backoff
+            backoff = min(backoff * 2, max(MAX_BACKOFF_SECONDS, CHECK_INTERVAL_SECONDS))
+
+        event = wait_for_network_event(timeout)
+        if _RELOAD_REQUESTED[0]:
+            _RELOAD_REQUESTED[0] = False
+            _reload_config()
+        if event:
+            logging.info("收到网络变化事件（%s），立即重新检测。", event)
+            backoff = CHECK_INTERVAL_SECONDS
 
 
 if __name__ == "__main__":